@@ -1,14 +1,16 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 import asyncpg
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.auth.jwt import require_roles, get_current_user
 from app.auth.schemas import UserInDB, UserResponse
 from app.common import database
+from app.common.pagination import decode_cursor, encode_cursor, estimate_count, page_count
+from app.common.search import ilike_any, like_pattern, similarity_rank
 from . import schemas
 from app.loans.schemas import LoanResponse
-from app.logic import get_enriched_loan
+from app.logic import get_associate_portfolio_summary, get_enriched_loans
 
 class PaginatedAssociateResponse(BaseModel):
     items: List[schemas.AssociateResponse]
@@ -16,6 +18,8 @@ class PaginatedAssociateResponse(BaseModel):
     page: int
     limit: int
     pages: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 router = APIRouter()
 
@@ -24,6 +28,8 @@ async def get_associates(
     page: int = 1,
     limit: int = 20,
     search: str = None,
+    after: Optional[str] = None,
+    estimate_total: bool = False,
     conn: asyncpg.Connection = Depends(database.get_db)
 ):
     offset = (page - 1) * limit
@@ -31,11 +37,10 @@ async def get_associates(
     params = []
     where_clauses = []
 
+    search_fields = ["name", "contact_person", "contact_email"]
     if search:
-        params.append(f"%{search}%")
-        search_fields = ["name", "contact_person", "contact_email"]
-        search_conditions = " OR ".join([f"{field} ILIKE ${len(params)}" for field in search_fields])
-        where_clauses.append(f"({search_conditions})")
+        params.append(like_pattern(search))
+        where_clauses.append(ilike_any(search_fields, f"${len(params)}"))
 
     where_sql = ""
     if where_clauses:
@@ -45,30 +50,60 @@ async def get_associates(
     count_query = "SELECT COUNT(id) " + base_query
     data_query = "SELECT * " + base_query
 
-    total_records = await conn.fetchval(count_query, *params)
-    
-    data_query += f" ORDER BY id LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-    params.extend([limit, offset])
+    if estimate_total:
+        total_records = await estimate_count(conn, "SELECT id " + base_query, *params)
+    else:
+        total_records = await conn.fetchval(count_query, *params)
+
+    # Modo cursor: busca por clave (id > último id entregado) en lugar de OFFSET.
+    if after:
+        params.append(decode_cursor(after))
+        where_clauses.append(f"id > ${len(params)}")
+        data_query = "SELECT * FROM associates WHERE " + " AND ".join(where_clauses)
+        offset = 0
+
+    # Con búsqueda (y sin cursor) los resultados se ordenan por relevancia.
+    ranked = bool(search) and not after
+    order_sql = "id"
+    if ranked:
+        params.append(search)
+        order_sql = f"{similarity_rank(search_fields, f'${len(params)}')} DESC, id"
+
+    data_query += f" ORDER BY {order_sql} LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
+    params.extend([limit + 1, offset])
     
     records = await conn.fetch(data_query, *params)
+    next_cursor = encode_cursor(records[limit - 1]['id']) if not ranked and limit > 0 and len(records) > limit else None
     
     return {
-        "items": [dict(rec) for rec in records],
+        "items": [dict(rec) for rec in records[:limit]],
         "total": total_records,
         "page": page,
         "limit": limit,
-        "pages": (total_records + limit - 1) // limit if limit > 0 else 0
+        "pages": page_count(total_records, limit),
+        "next_cursor": next_cursor,
+        "total_is_estimate": estimate_total
     }
 
 class AssociateDashboardData(BaseModel):
     summary: schemas.AssociateSummaryResponse
     loans: List[LoanResponse]
     users: List[UserResponse]
+    loans_next_cursor: Optional[str] = None
+    users_next_cursor: Optional[str] = None
 
 @router.get("/dashboard", response_model=AssociateDashboardData)
 async def get_associate_dashboard_data(
+    limit: int = Query(20, ge=1, le=100),
+    loans_after: Optional[str] = None,
+    users_after: Optional[str] = None,
     current_user: UserInDB = Depends(get_current_user)
 ):
+    """
+    Resumen de la cartera del asociado (una fila de `associate_portfolio_stats`)
+    y una página de sus préstamos y de sus clientes, más recientes primero.
+    Las páginas siguientes se piden con `loans_after` / `users_after`.
+    """
     if "asociado" not in current_user.roles:
         raise HTTPException(status_code=403, detail="Acceso denegado.")
     
@@ -76,41 +111,51 @@ async def get_associate_dashboard_data(
     if not associate_id:
         raise HTTPException(status_code=404, detail="Usuario no está vinculado a ningún asociado.")
 
-    async with database.db_pool.acquire() as conn:
-        loan_ids_records = await conn.fetch("SELECT id FROM loans WHERE associate_id = $1", associate_id)
-        
-        enriched_loans_dicts = [await get_enriched_loan(conn, r['id']) for r in loan_ids_records if await get_enriched_loan(conn, r['id'])]
-        
-        summary_data = {
-            "total_loans": len(enriched_loans_dicts), "active_loans": 0,
-            "total_loaned_amount": 0.0, "total_outstanding_balance": 0.0, "total_commission": 0.0
-        }
-        for loan in enriched_loans_dicts:
-            summary_data["total_loaned_amount"] += float(loan['amount'])
-            summary_data["total_outstanding_balance"] += float(loan['outstanding_balance'])
-            if loan['status'] == 'active': summary_data["active_loans"] += 1
-            commission = float(loan['amount']) * (float(loan['commission_rate'] or 0) / 100.0)
-            summary_data["total_commission"] += commission
-        
-        user_ids = {loan['user_id'] for loan in enriched_loans_dicts}
-        users_records = []
-        if user_ids:
-            users_query = "SELECT * FROM users WHERE id = ANY($1::int[])"
-            users_records = await conn.fetch(users_query, list(user_ids))
-
-        final_summary = schemas.AssociateSummaryResponse.model_validate(summary_data)
-        final_loans = [LoanResponse.model_validate(loan) for loan in enriched_loans_dicts]
-        
+    async with database.get_db_context() as conn:
+        summary_data = await get_associate_portfolio_summary(conn, associate_id)
+
+        params = [associate_id, limit + 1]
+        cursor_filter = ""
+        if loans_after:
+            params.append(decode_cursor(loans_after))
+            cursor_filter = "AND id < $3"
+        loan_ids_records = await conn.fetch(
+            f"SELECT id FROM loans WHERE associate_id = $1 {cursor_filter} ORDER BY id DESC LIMIT $2", *params
+        )
+        loan_ids = [r['id'] for r in loan_ids_records[:limit]]
+        loans_next_cursor = encode_cursor(loan_ids[-1]) if len(loan_ids_records) > limit else None
+        enriched_loans_dicts = await get_enriched_loans(conn, loan_ids)
+
+        params = [associate_id, limit + 1]
+        cursor_filter = ""
+        if users_after:
+            params.append(decode_cursor(users_after))
+            cursor_filter = "AND u.id < $3"
+        users_records = await conn.fetch(
+            f"""
+            SELECT u.* FROM users u
+            WHERE EXISTS (SELECT 1 FROM loans l WHERE l.user_id = u.id AND l.associate_id = $1) {cursor_filter}
+            ORDER BY u.id DESC LIMIT $2
+            """,
+            *params
+        )
+        users_next_cursor = encode_cursor(users_records[limit - 1]['id']) if len(users_records) > limit else None
+        users_records = users_records[:limit]
+
+        roles_by_user = await database.get_users_roles(conn, [r['id'] for r in users_records])
         final_users = []
         for user_record in users_records:
             user_dict = dict(user_record)
-            user_dict['roles'] = await database.get_user_roles(conn, user_dict['id'])
-            final_users.append(UserResponse.model_validate(user_dict))
-
-    return AssociateDashboardData(
-        summary=final_summary,
-        loans=final_loans,
-        users=final_users
-    )
+            user_dict['roles'] = roles_by_user[user_dict['id']]
+            final_users.append(user_dict)
+
+    # `response_model` valida y serializa todo en una sola pasada.
+    return {
+        "summary": summary_data,
+        "loans": enriched_loans_dicts,
+        "users": final_users,
+        "loans_next_cursor": loans_next_cursor,
+        "users_next_cursor": users_next_cursor,
+    }
 
 # ... (resto de las rutas)
@@ -16,6 +16,7 @@ class AssociateUpdate(AssociateBase):
     pass
 
 class AssociateResponse(AssociateBase):
+    contact_email: Optional[str] = None  # ya validado al guardarse
     id: int
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
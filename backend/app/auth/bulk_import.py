@@ -0,0 +1,233 @@
+"""
+Importación masiva de usuarios (altas de la cartera de clientes de un asociado).
+
+Acepta CSV o NDJSON. Cada fila se valida contra `UserImportRow` y contra la BD
+(roles, asociado y columnas únicas) antes de escribir nada. Las filas con
+errores se omiten y se reportan con su número; las válidas se cargan en una
+sola transacción con COPY a una tabla temporal y un único
+`INSERT ... SELECT`, seguido de COPY de `user_roles` y `beneficiaries`.
+
+En CSV los roles van separados por `|` y el beneficiario en las columnas
+`beneficiary_full_name`, `beneficiary_relationship` y `beneficiary_phone_number`.
+Las filas se numeran desde 1 sin contar el encabezado. Una línea NDJSON que no
+es JSON válido se reporta como error de esa fila y no impide importar el resto.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+import asyncpg
+from pydantic import ValidationError
+
+from app.auth.hashing import password_hasher, pwd_context
+from app.auth.schemas import UserImportError, UserImportResult, UserImportRow
+from app.utils.availability import availability_filter
+
+USER_COLUMNS = (
+    'username', 'password_hash', 'first_name', 'last_name', 'email', 'phone_number', 'birth_date', 'curp',
+    'profile_picture_url', 'address_street', 'address_ext_num', 'address_int_num', 'address_colonia',
+    'address_zip_code', 'address_state', 'associate_id',
+)
+UNIQUE_COLUMNS = ('username', 'email', 'phone_number', 'curp')
+
+# Longitudes de las columnas VARCHAR (db/init.sql): un valor más largo
+# abortaría la transacción completa, así que se rechaza la fila antes.
+MAX_LENGTHS = {
+    'username': 50, 'first_name': 100, 'last_name': 100, 'email': 100, 'curp': 18,
+    'profile_picture_url': 255, 'address_street': 255, 'address_ext_num': 20, 'address_int_num': 20,
+    'address_colonia': 100, 'address_zip_code': 10, 'address_state': 50,
+}
+BENEFICIARY_MAX_LENGTHS = {'full_name': 255, 'relationship': 50, 'phone_number': 10}
+
+SUPPORTED_FORMATS = ('csv', 'ndjson')
+
+
+class UnparsableRow:
+    """Marca una fila que no se pudo leer; `_validate` la reporta con `message`."""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def _parse_json_line(line: str):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return UnparsableRow(f"JSON inválido: {e.msg} (columna {e.colno}).")
+
+
+def parse_rows(content: str, fmt: str) -> List[dict]:
+    """Convierte el contenido de un archivo CSV o NDJSON en una lista de diccionarios."""
+    if fmt == 'ndjson':
+        return [_parse_json_line(line) for line in content.splitlines() if line.strip()]
+    if fmt != 'csv':
+        raise ValueError(f"Formato no soportado: {fmt}. Usa uno de {', '.join(SUPPORTED_FORMATS)}.")
+
+    rows = []
+    for record in csv.DictReader(io.StringIO(content)):
+        row = {key.strip(): value.strip() for key, value in record.items() if key and value and value.strip()}
+        if 'roles' in row:
+            row['roles'] = [role.strip() for role in row['roles'].split('|') if role.strip()]
+        beneficiary = {
+            field: row.pop(f'beneficiary_{field}')
+            for field in BENEFICIARY_MAX_LENGTHS if f'beneficiary_{field}' in row
+        }
+        if beneficiary:
+            row['beneficiary'] = beneficiary
+        rows.append(row)
+    return rows
+
+
+def _validate(number: int, raw: dict, errors: List[UserImportError]):
+    def fail(field, message):
+        errors.append(UserImportError(row=number, username=raw.get('username') if isinstance(raw, dict) else None, field=field, message=message))
+
+    if isinstance(raw, UnparsableRow):
+        fail(None, raw.message)
+        return None
+    if not isinstance(raw, dict):
+        fail(None, "La fila debe ser un objeto.")
+        return None
+    try:
+        user = UserImportRow.model_validate(raw)
+    except ValidationError as e:
+        for error in e.errors():
+            fail(".".join(str(part) for part in error['loc']) or None, error['msg'])
+        return None
+
+    if (user.password is None) == (user.password_hash is None):
+        fail('password', "Indica exactamente uno de password o password_hash.")
+        return None
+    if user.password_hash is not None and pwd_context.identify(user.password_hash) != 'bcrypt':
+        fail('password_hash', "password_hash debe ser un hash bcrypt.")
+        return None
+    if not user.roles:
+        fail('roles', "El usuario debe tener al menos un rol.")
+        return None
+
+    too_long = [(field, limit) for field, limit in MAX_LENGTHS.items() if len(getattr(user, field) or '') > limit]
+    if user.beneficiary:
+        too_long += [
+            (f'beneficiary.{field}', limit) for field, limit in BENEFICIARY_MAX_LENGTHS.items()
+            if len(getattr(user.beneficiary, field)) > limit
+        ]
+    for field, limit in too_long:
+        fail(field, f"Máximo {limit} caracteres.")
+    return None if too_long else user
+
+
+async def import_users(conn: asyncpg.Connection, raw_rows: Sequence[dict]) -> UserImportResult:
+    """
+    Valida e inserta `raw_rows`. Devuelve cuántas filas se crearon y los
+    errores por fila de las que se omitieron.
+    """
+    errors: List[UserImportError] = []
+    candidates: Dict[int, UserImportRow] = {}
+    for number, raw in enumerate(raw_rows, start=1):
+        user = _validate(number, raw, errors)
+        if user is not None:
+            candidates[number] = user
+
+    def reject(number, field, message):
+        errors.append(UserImportError(row=number, username=candidates[number].username, field=field, message=message))
+        del candidates[number]
+
+    role_ids = {record['name']: record['id'] for record in await conn.fetch("SELECT id, name FROM roles")}
+    for number, user in list(candidates.items()):
+        unknown = sorted(set(user.roles) - role_ids.keys())
+        if unknown:
+            reject(number, 'roles', f"Roles no válidos: {', '.join(unknown)}.")
+
+    associate_ids = {user.associate_id for user in candidates.values() if user.associate_id is not None}
+    if associate_ids:
+        existing = {record['id'] for record in await conn.fetch("SELECT id FROM associates WHERE id = ANY($1::int[])", list(associate_ids))}
+        for number, user in list(candidates.items()):
+            if user.associate_id is not None and user.associate_id not in existing:
+                reject(number, 'associate_id', f"El asociado {user.associate_id} no existe.")
+
+    # Duplicados dentro del archivo: se conserva la primera aparición.
+    seen = defaultdict(dict)
+    for number, user in list(candidates.items()):
+        for column in UNIQUE_COLUMNS:
+            value = getattr(user, column)
+            if value is None:
+                continue
+            if value in seen[column]:
+                reject(number, column, f"{column} repetido en la fila {seen[column][value]}.")
+                break
+            seen[column][value] = number
+
+    # Valores que ya existen en la BD, con una sola consulta.
+    taken = defaultdict(set)
+    if candidates:
+        records = await conn.fetch(
+            """
+            SELECT username, email, phone_number, curp FROM users
+            WHERE username = ANY($1::text[]) OR email = ANY($2::text[]) OR phone_number = ANY($3::text[]) OR curp = ANY($4::text[])
+            """,
+            *(list(seen[column]) for column in UNIQUE_COLUMNS)
+        )
+        for record in records:
+            for column in UNIQUE_COLUMNS:
+                if record[column] is not None:
+                    taken[column].add(record[column])
+        for number, user in list(candidates.items()):
+            column = next((column for column in UNIQUE_COLUMNS if getattr(user, column) in taken[column]), None)
+            if column:
+                reject(number, column, f"El {column} ya está registrado.")
+
+    created = 0
+    if candidates:
+        numbers = list(candidates)
+        to_hash = [number for number in numbers if candidates[number].password_hash is None]
+        for number, hashed in zip(to_hash, await password_hasher.hash_many([candidates[number].password for number in to_hash])):
+            candidates[number].password_hash = hashed
+        created = await _load(conn, candidates, role_ids, errors)
+
+    errors.sort(key=lambda error: error.row)
+    return UserImportResult(received=len(raw_rows), created=created, errors=errors)
+
+
+async def _load(conn: asyncpg.Connection, candidates: Dict[int, UserImportRow], role_ids: Dict[str, int], errors: List[UserImportError]) -> int:
+    async with conn.transaction():
+        await conn.execute(
+            f"CREATE TEMP TABLE import_users ON COMMIT DROP AS "
+            f"SELECT 0 AS row_number, {', '.join(USER_COLUMNS)} FROM users WITH NO DATA"
+        )
+        await conn.copy_records_to_table(
+            'import_users', columns=('row_number', *USER_COLUMNS),
+            records=[(number, *(getattr(user, column) for column in USER_COLUMNS)) for number, user in candidates.items()]
+        )
+        # ON CONFLICT DO NOTHING cubre las altas concurrentes que no vio la validación previa.
+        inserted = await conn.fetch(
+            f"""
+            INSERT INTO users ({', '.join(USER_COLUMNS)})
+            SELECT {', '.join(USER_COLUMNS)} FROM import_users ORDER BY row_number
+            ON CONFLICT DO NOTHING
+            RETURNING id, username
+            """
+        )
+        user_ids = {record['username']: record['id'] for record in inserted}
+
+        user_roles, beneficiaries = [], []
+        for number, user in candidates.items():
+            user_id = user_ids.get(user.username)
+            if user_id is None:
+                errors.append(UserImportError(row=number, username=user.username, message="Conflicto de unicidad con un usuario creado durante la importación."))
+                continue
+            user_roles.extend((user_id, role_ids[role]) for role in set(user.roles))
+            if user.beneficiary:
+                beneficiaries.append((user_id, user.beneficiary.full_name, user.beneficiary.relationship, user.beneficiary.phone_number))
+
+        if user_roles:
+            await conn.copy_records_to_table('user_roles', columns=('user_id', 'role_id'), records=user_roles)
+        if beneficiaries:
+            await conn.copy_records_to_table(
+                'beneficiaries', columns=('user_id', 'full_name', 'relationship', 'phone_number'), records=beneficiaries
+            )
+    availability_filter.add(
+        user.model_dump(include=set(UNIQUE_COLUMNS)) for user in candidates.values() if user.username in user_ids
+    )
+    return len(user_ids)
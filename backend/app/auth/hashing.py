@@ -0,0 +1,135 @@
+"""
+Hash y verificación de contraseñas fuera del event loop.
+
+bcrypt es deliberadamente lento, así que ambas operaciones corren en un pool
+de hilos propio y acotado (bcrypt libera el GIL mientras calcula). Si ya hay
+`PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE` operaciones admitidas, las
+nuevas se rechazan de inmediato con 503 en lugar de encolarse sin límite y
+frenar al resto de peticiones. Los lotes (`hash_many`) no se rechazan: esperan
+a que haya lugar.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.common import metrics
+
+# min_rounds = max_rounds = costo configurado: cualquier hash con otro costo
+# se marca como desactualizado y se vuelve a generar en el siguiente login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.capacity = max_workers + queue_size
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+
+    async def _run(self, operation: str, func, *args, reject: bool = True):
+        if self.admitted >= self.capacity and not reject:
+            await self._wait_for_capacity()
+        if self.admitted >= self.capacity:
+            self.rejected += 1
+            metrics.PASSWORD_HASHING_REJECTED.inc(operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El servicio de autenticación está saturado, intenta de nuevo en unos segundos.",
+                headers={"Retry-After": "1"},
+            )
+
+        submitted = time.perf_counter()
+
+        def timed_call():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                metrics.PASSWORD_HASHING_WAIT.observe(started - submitted, operation)
+                metrics.PASSWORD_HASHING_LATENCY.observe(time.perf_counter() - started, operation)
+
+        self.admitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed_call)
+        finally:
+            self.admitted -= 1
+            self._wake_next()
+
+    async def _wait_for_capacity(self) -> None:
+        while self.admitted >= self.capacity:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Si ya se le había cedido el lugar, pasa al siguiente en espera.
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_next()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _wake_next(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """
+        Hashea un lote (p. ej. una importación masiva) usando como mucho
+        `max_workers` lugares a la vez, para dejar la cola libre a los logins.
+        Si los logins llenan la cola, el lote espera en lugar de fallar.
+        """
+        limit = asyncio.Semaphore(self.max_workers)
+
+        async def hash_one(password: str) -> str:
+            async with limit:
+                return await self._run("hash", pwd_context.hash, password, reject=False)
+
+        tasks = [asyncio.ensure_future(hash_one(password)) for password in passwords]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """Verifica la contraseña y, si el hash usa otro costo, devuelve uno nuevo."""
+        return await self._run("verify", pwd_context.verify_and_update, password, password_hash)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "admitted": self.admitted,
+            "queued": max(0, self.admitted - self.max_workers),
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
+metrics.register_stats_gauges("credinet_password_hasher", "Pool de hash de contraseñas de este worker.", password_hasher.stats)
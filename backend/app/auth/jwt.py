@@ -1,9 +1,7 @@
-import asyncio
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 import asyncpg
 from typing import List
 
@@ -11,6 +9,9 @@ from app.auth.schemas import TokenData, UserResponse, UserInDB
 from app.core.config import settings
 from app.common.database import get_db
 from app.common.database import get_user_roles
+from app.common.cache import TTLCache
+from app.common import metrics
+from app.auth.hashing import password_hasher
 
 # Configuración de seguridad
 SECRET_KEY = settings.SECRET_KEY
@@ -18,7 +19,11 @@ ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Usuarios autenticados recientes (username -> UserInDB), para no consultar
+# `users` y `user_roles` en cada petición.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+metrics.register_stats_gauges("credinet_user_cache", "Caché de usuarios autenticados de este worker.", user_cache.stats)
 
 import logging
 
@@ -39,16 +44,23 @@ async def authenticate_user(conn: asyncpg.Connection, identifier: str, password:
     password_hash_from_db = user_record['password_hash']
     
     try:
-        is_password_correct = await asyncio.to_thread(pwd_context.verify, password, password_hash_from_db)
+        is_password_correct, new_hash = await password_hasher.verify_and_update(password, password_hash_from_db)
         if not is_password_correct:
             logger.warning(f"Authentication failed: Incorrect password for user with identifier '{identifier}'.")
             return None
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during password verification for user with identifier '{identifier}': {e}", exc_info=True)
         return None
 
     logger.info(f"Authentication successful for user with identifier: {identifier}")
     user_dict = dict(user_record)
+    if new_hash:
+        # El hash usaba otro costo de bcrypt: se reemplaza de forma transparente.
+        await conn.execute("UPDATE users SET password_hash = $1 WHERE id = $2", new_hash, user_dict['id'])
+        user_dict['password_hash'] = new_hash
+        invalidate_cached_user(user_id=user_dict['id'])
     user_dict['roles'] = await get_user_roles(conn, user_dict['id'])
     return UserInDB(**user_dict)
 
@@ -73,6 +85,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), conn: asyncpg.Co
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+
+    cached_user = user_cache.get(username)
+    if cached_user is not None:
+        return cached_user.model_copy(deep=True)
     
     user_record = await conn.fetchrow("SELECT * FROM users WHERE username = $1", username)
     if user_record is None:
@@ -80,7 +96,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), conn: asyncpg.Co
     
     user_dict = dict(user_record)
     user_dict['roles'] = await get_user_roles(conn, user_dict['id'])
-    return UserInDB(**user_dict)
+    user = UserInDB(**user_dict)
+    user_cache.set(username, user.model_copy(deep=True))
+    return user
+
+def invalidate_cached_user(user_id: int | None = None, username: str | None = None):
+    """Descarta del caché a un usuario cuyos datos o roles cambiaron."""
+    if username is not None:
+        user_cache.pop(username)
+    if user_id is not None:
+        user_cache.invalidate_where(lambda _, user: user.id == user_id)
 
 async def get_current_user_response(user: UserInDB = Depends(get_current_user)) -> UserResponse:
     """Devuelve un modelo UserResponse a partir del usuario actual."""
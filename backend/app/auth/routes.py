@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, File, Query, Response, UploadFile, status
 from fastapi.security import OAuth2PasswordRequestForm
 import asyncpg
-from typing import List
-
-from app.auth.schemas import UserCreate, UserResponse, Token, UserUpdate, PaginatedUserResponse, UserInDB
-from app.auth.jwt import create_access_token, authenticate_user, get_current_user, require_roles, pwd_context
-from app.common.database import get_db, get_user_roles
-from app.loans.schemas import ClientDashboardResponse, ClientDashboardSummary, ClientDashboardLoan, ClientDashboardPayment
-from app.logic import get_enriched_loan
+from typing import List, Optional
+
+from app.auth.schemas import UserCreate, UserResponse, Token, UserUpdate, PaginatedUserResponse, UserInDB, UserImportResult
+from app.auth.jwt import create_access_token, authenticate_user, get_current_user, require_roles, invalidate_cached_user
+from app.auth.hashing import password_hasher
+from app.auth import bulk_import
+from app.utils.availability import availability_filter
+from app.common.database import get_db, get_users_roles
+from app.common.pagination import decode_cursor, encode_cursor, estimate_count, page_count
+from app.common.search import ilike_any, like_pattern, similarity_rank
+from app.loans.client_dashboard import get_client_dashboard_json
+from app.loans.schemas import ClientDashboardResponse
 
 router = APIRouter()
 
@@ -17,7 +22,7 @@ async def register_user(
     current_user: UserInDB = Depends(require_roles(["administrador", "desarrollador"])),
     conn: asyncpg.Connection = Depends(get_db)
 ):
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     
     async with conn.transaction():
         try:
@@ -91,8 +96,30 @@ async def register_user(
                 raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La CURP ya está registrada.")
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Error de unicidad no manejado: {e.constraint_name}")
 
+    invalidate_cached_user(user_id=user_dict['id'], username=user_dict['username'])
+    availability_filter.add([user_dict])
     user_dict['roles'] = user_data.roles
-    return UserResponse.model_validate(user_dict)
+    return user_dict
+
+@router.post("/users/import", response_model=UserImportResult)
+async def import_users(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv o ndjson; por defecto se deduce de la extensión del archivo."),
+    current_user: UserInDB = Depends(require_roles(["administrador", "desarrollador"])),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """
+    Alta masiva de usuarios desde CSV o NDJSON. Las filas inválidas o que
+    chocan con usuarios existentes se omiten y se devuelven en `errors`.
+    """
+    fmt = format or (file.filename or '').rsplit('.', 1)[-1].lower()
+    if fmt not in bulk_import.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El formato debe ser csv o ndjson.")
+    try:
+        rows = bulk_import.parse_rows((await file.read()).decode('utf-8-sig'), fmt)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No se pudo leer el archivo: {e}")
+    return await bulk_import.import_users(conn, rows)
 
 
 @router.post("/login", response_model=Token)
@@ -113,31 +140,17 @@ async def login_for_access_token(
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: UserInDB = Depends(get_current_user)):
-    user_dict = current_user.model_dump()
-    return UserResponse.model_validate(user_dict)
+    return current_user
 
 @router.get("/me/dashboard", response_model=ClientDashboardResponse)
 async def get_client_dashboard(
-    current_user: UserInDB = Depends(require_roles(["cliente"])),
-    conn: asyncpg.Connection = Depends(get_db)
+    current_user: UserInDB = Depends(require_roles(["cliente"]))
 ):
-    user_id = current_user.id
-    loan_ids_records = await conn.fetch("SELECT id FROM loans WHERE user_id = $1", user_id)
-    all_user_loans = [await get_enriched_loan(conn, r['id']) for r in loan_ids_records if await get_enriched_loan(conn, r['id'])]
-    active_loans = [loan for loan in all_user_loans if loan['status'] == 'active']
-    summary = ClientDashboardSummary(
-        active_loans_count=len(active_loans),
-        total_outstanding_balance=sum(loan['outstanding_balance'] for loan in active_loans)
-    )
-    recent_payments_records = await conn.fetch(
-        "SELECT p.id, p.loan_id, p.amount_paid, p.payment_date FROM payments p JOIN loans l ON p.loan_id = l.id WHERE l.user_id = $1 ORDER BY p.payment_date DESC LIMIT 5",
-        user_id
-    )
-    return ClientDashboardResponse(
-        summary=summary,
-        loans=[ClientDashboardLoan.model_validate(loan) for loan in all_user_loans],
-        recent_payments=[ClientDashboardPayment.model_validate(dict(p)) for p in recent_payments_records]
-    )
+    """
+    Préstamos, saldo pendiente y últimos pagos del cliente. Se calcula con una
+    sola consulta y se sirve desde caché hasta que cambian sus préstamos o pagos.
+    """
+    return Response(content=await get_client_dashboard_json(current_user.id), media_type="application/json")
 
 @router.get("/users", response_model=PaginatedUserResponse)
 async def read_users(
@@ -145,6 +158,8 @@ async def read_users(
     limit: int = 20,
     role: str = None,
     search: str = None,
+    after: Optional[str] = None,
+    estimate_total: bool = False,
     conn: asyncpg.Connection = Depends(get_db),
     current_user: UserInDB = Depends(require_roles(["administrador", "desarrollador"]))
 ):
@@ -157,11 +172,10 @@ async def read_users(
         params.append(role)
         where_clauses.append(f"id IN (SELECT user_id FROM user_roles ur JOIN roles r ON ur.role_id = r.id WHERE r.name = ${len(params)})")
 
+    search_fields = ["username", "first_name", "last_name", "email", "phone_number"]
     if search:
-        params.append(f"%{search}%")
-        search_fields = ["username", "first_name", "last_name", "email", "phone_number"]
-        search_conditions = " OR ".join([f"{field} ILIKE ${len(params)}" for field in search_fields])
-        where_clauses.append(f"({search_conditions})")
+        params.append(like_pattern(search))
+        where_clauses.append(ilike_any(search_fields, f"${len(params)}"))
 
     where_sql = ""
     if where_clauses:
@@ -171,23 +185,46 @@ async def read_users(
     count_query = "SELECT COUNT(id) " + base_query
     data_query = "SELECT * " + base_query
 
-    total_records = await conn.fetchval(count_query, *params)
-    
-    data_query += f" ORDER BY id LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-    params.extend([limit, offset])
+    if estimate_total:
+        total_records = await estimate_count(conn, "SELECT id " + base_query, *params)
+    else:
+        total_records = await conn.fetchval(count_query, *params)
+
+    # Modo cursor: busca por clave (id > último id entregado) en lugar de OFFSET.
+    if after:
+        params.append(decode_cursor(after))
+        where_clauses.append(f"id > ${len(params)}")
+        data_query = "SELECT * FROM users WHERE " + " AND ".join(where_clauses)
+        offset = 0
+
+    # Con búsqueda (y sin cursor) los resultados se ordenan por relevancia.
+    ranked = bool(search) and not after
+    order_sql = "id"
+    if ranked:
+        params.append(search)
+        order_sql = f"{similarity_rank(search_fields, f'${len(params)}')} DESC, id"
+
+    data_query += f" ORDER BY {order_sql} LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
+    params.extend([limit + 1, offset])
     
     user_records = await conn.fetch(data_query, *params)
+    next_cursor = encode_cursor(user_records[limit - 1]['id']) if not ranked and limit > 0 and len(user_records) > limit else None
+    user_records = user_records[:limit]
     
+    roles_by_user = await get_users_roles(conn, [r['id'] for r in user_records])
+    # Se devuelven dicts: `response_model` los valida y serializa una sola vez.
     items = []
     for user_record in user_records:
         user_dict = dict(user_record)
-        user_dict['roles'] = await get_user_roles(conn, user_dict['id'])
-        items.append(UserResponse.model_validate(user_dict))
+        user_dict['roles'] = roles_by_user[user_dict['id']]
+        items.append(user_dict)
 
     return {
         "items": items,
         "total": total_records,
         "page": page,
         "limit": limit,
-        "pages": (total_records + limit - 1) // limit if limit > 0 else 0
+        "pages": page_count(total_records, limit),
+        "next_cursor": next_cursor,
+        "total_is_estimate": estimate_total
     }
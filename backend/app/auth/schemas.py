@@ -37,6 +37,25 @@ class UserCreate(UserBase):
     beneficiary: Optional[BeneficiaryCreate] = None
     associate_data: Optional[AssociateCreate] = None # Añadir associate_data
 
+class UserImportRow(UserBase):
+    """Fila de una importación masiva: `password` en claro o `password_hash` bcrypt ya calculado."""
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+    roles: List[str] = ['cliente']
+    associate_id: Optional[int] = None
+    beneficiary: Optional[BeneficiaryCreate] = None
+
+class UserImportError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    field: Optional[str] = None
+    message: str
+
+class UserImportResult(BaseModel):
+    received: int
+    created: int
+    errors: List[UserImportError]
+
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     first_name: Optional[str] = None
@@ -57,6 +76,9 @@ class UserUpdate(BaseModel):
     associate_id: Optional[int] = None
 
 class UserInDB(UserBase):
+    # Valores leídos de la BD, ya validados al escribirse: `email_validator`
+    # cuesta más que el resto del modelo junto.
+    email: Optional[str] = None
     id: int
     roles: List[str]
     password_hash: str
@@ -65,6 +87,7 @@ class UserInDB(UserBase):
     model_config = ConfigDict(from_attributes=True)
 
 class UserResponse(UserBase):
+    email: Optional[str] = None
     id: int
     roles: List[str]
     associate_id: Optional[int] = None
@@ -77,6 +100,8 @@ class PaginatedUserResponse(BaseModel):
     page: int
     limit: int
     pages: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 class Token(BaseModel):
     access_token: str
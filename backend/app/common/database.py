@@ -1,29 +1,141 @@
 # backend/app/common/database.py
+import asyncio
 import asyncpg
 import os
+import time
 from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
 from app.core.config import settings
-from typing import List
+from app.common import metrics, query_log
+from typing import Dict, Iterable, List
 
 # Esta configuración se usará por defecto
 DATABASE_URL = f"postgresql://{os.getenv('POSTGRES_USER')}:{os.getenv('POSTGRES_PASSWORD')}@{os.getenv('POSTGRES_HOST')}/{os.getenv('POSTGRES_DB')}"
 
+# Parámetros de conexión directa (usados por cli.py fuera del pool de la app)
+DB_CONFIG = {
+    "user": os.getenv('POSTGRES_USER'),
+    "password": os.getenv('POSTGRES_PASSWORD'),
+    "host": os.getenv('POSTGRES_HOST'),
+    "database": os.getenv('POSTGRES_DB'),
+}
+
 db_pool = None
 
+
+class PoolMetrics:
+    """Contadores de adquisición de conexiones del pool (por worker)."""
+
+    def __init__(self):
+        self.acquires = 0
+        self.acquire_timeouts = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+
+    def record_acquire(self, wait: float):
+        self.acquires += 1
+        self.acquire_wait_total += wait
+        self.acquire_wait_max = max(self.acquire_wait_max, wait)
+
+
+pool_metrics = PoolMetrics()
+metrics.register_stats_gauges("credinet_db_pool", "Estado del pool de conexiones de este worker.", lambda: get_pool_stats())
+
+
+class InstrumentedConnection:
+    """
+    Envoltura de la conexión que entrega get_db/get_db_context: mide cada
+    consulta, la registra en las métricas por ruta y pasa las lentas al
+    registro de consultas lentas (app/common/query_log.py). El resto de atributos
+    (transaction, copy_*, cursor, ...) se delegan a la conexión real.
+    """
+
+    def __init__(self, conn: asyncpg.Connection):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    async def _timed(self, method, query, args, logged_args=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await method(query, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started
+            metrics.observe_db_query(duration)
+        # Sólo las consultas que terminaron bien: una fallida o cancelada no es una consulta lenta.
+        query_log.record_query(query, args if logged_args is None else logged_args, duration)
+        return result
+
+    async def fetch(self, query, *args, **kwargs):
+        return await self._timed(self._conn.fetch, query, args, **kwargs)
+
+    async def fetchrow(self, query, *args, **kwargs):
+        return await self._timed(self._conn.fetchrow, query, args, **kwargs)
+
+    async def fetchval(self, query, *args, **kwargs):
+        return await self._timed(self._conn.fetchval, query, args, **kwargs)
+
+    async def execute(self, query, *args, **kwargs):
+        return await self._timed(self._conn.execute, query, args, **kwargs)
+
+    async def executemany(self, command, args, **kwargs):
+        return await self._timed(self._conn.executemany, command, (args,), logged_args=(), **kwargs)
+
+
+def _server_settings() -> dict:
+    server_settings = {"application_name": settings.DB_APPLICATION_NAME}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+    if settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS > 0:
+        server_settings["idle_in_transaction_session_timeout"] = str(settings.DB_IDLE_IN_TRANSACTION_TIMEOUT_MS)
+    return server_settings
+
+
+def get_database_url() -> str:
+    # Si la variable de entorno TESTING está puesta, usa la URL de prueba.
+    return settings.TEST_DATABASE_URL if os.getenv('TESTING') else DATABASE_URL
+
 async def create_db_pool():
     global db_pool
     if db_pool is None:
-        # Si la variable de entorno TESTING está puesta, usa la URL de prueba.
-        url = settings.TEST_DATABASE_URL if os.getenv('TESTING') else DATABASE_URL
-        db_pool = await asyncpg.create_pool(url)
-        print(f"✅ Pool de conexiones a la base de datos creado para: {url.split('@')[-1]}")
+        url = get_database_url()
+        db_pool = await asyncpg.create_pool(
+            url,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            max_queries=settings.DB_POOL_MAX_QUERIES,
+            max_inactive_connection_lifetime=settings.DB_POOL_MAX_INACTIVE_LIFETIME,
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            command_timeout=settings.DB_COMMAND_TIMEOUT or None,
+            server_settings=_server_settings(),
+        )
+        print(f"✅ Pool de conexiones a la base de datos creado para: {url.split('@')[-1]} "
+              f"(min={settings.DB_POOL_MIN_SIZE}, max={settings.DB_POOL_MAX_SIZE})")
 
 async def close_db_pool():
     global db_pool
     if db_pool:
         await db_pool.close()
+        db_pool = None
         print("✅ Pool de conexiones a la base de datos cerrado.")
 
+def get_pool_stats() -> dict:
+    """Estado del pool de este worker: tamaño, conexiones en uso/libres y esperas de adquisición."""
+    stats = {
+        "size": 0, "min_size": settings.DB_POOL_MIN_SIZE, "max_size": settings.DB_POOL_MAX_SIZE,
+        "in_use": 0, "idle": 0,
+        "acquires": pool_metrics.acquires,
+        "acquire_timeouts": pool_metrics.acquire_timeouts,
+        "acquire_wait_avg_ms": round(1000 * pool_metrics.acquire_wait_total / pool_metrics.acquires, 3) if pool_metrics.acquires else 0.0,
+        "acquire_wait_max_ms": round(1000 * pool_metrics.acquire_wait_max, 3),
+    }
+    if db_pool is not None:
+        stats["size"] = db_pool.get_size()
+        stats["idle"] = db_pool.get_idle_size()
+        stats["in_use"] = stats["size"] - stats["idle"]
+    return stats
+
 @asynccontextmanager
 async def get_db_context():
     if db_pool is None:
@@ -31,8 +143,14 @@ async def get_db_context():
     
     conn = None
     try:
-        conn = await db_pool.acquire()
-        yield conn
+        started = time.perf_counter()
+        try:
+            conn = await db_pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            pool_metrics.acquire_timeouts += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Base de datos saturada, intenta de nuevo en unos segundos.")
+        pool_metrics.record_acquire(time.perf_counter() - started)
+        yield InstrumentedConnection(conn)
     finally:
         if conn:
             await db_pool.release(conn)
@@ -49,3 +167,20 @@ async def get_user_roles(conn: asyncpg.Connection, user_id: int) -> List[str]:
     """
     records = await conn.fetch(query, user_id)
     return [record['name'] for record in records]
+
+async def get_users_roles(conn: asyncpg.Connection, user_ids: Iterable[int]) -> Dict[int, List[str]]:
+    """Roles de varios usuarios en una sola consulta. Los usuarios sin roles devuelven []."""
+    ids = list(set(user_ids))
+    if not ids:
+        return {}
+    query = """
+        SELECT ur.user_id, array_agg(r.name ORDER BY r.id) AS roles
+        FROM user_roles ur
+        JOIN roles r ON r.id = ur.role_id
+        WHERE ur.user_id = ANY($1::int[])
+        GROUP BY ur.user_id
+    """
+    records = await conn.fetch(query, ids)
+    roles_by_user = {user_id: [] for user_id in ids}
+    roles_by_user.update({record['user_id']: list(record['roles']) for record in records})
+    return roles_by_user
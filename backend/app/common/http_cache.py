@@ -0,0 +1,47 @@
+# backend/app/common/http_cache.py
+"""
+GET condicional (ETag / If-None-Match) y Cache-Control.
+
+El ETag se deriva de marcas de versión baratas de leer (columnas `updated_at`
+mantenidas por triggers, contadores del libro mayor) más la versión de la API,
+de modo que se puede responder 304 antes de armar y serializar la respuesta.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Response, status
+
+from app.core.config import settings
+
+STAFF_ROLES = ("administrador", "auxiliar_administrativo", "asociado", "desarrollador")
+
+
+def make_etag(*parts) -> str:
+    """ETag fuerte a partir de los valores que determinan la representación."""
+    digest = hashlib.sha256("|".join(str(part) for part in (settings.API_VERSION, *parts)).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110): admite `*`, listas y prefijo W/."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def cache_control_for(roles: Iterable[str], client_max_age: int) -> str:
+    """
+    Las respuestas dependen del usuario, así que siempre son `private`. El
+    personal (que registra pagos y edita préstamos) revalida en cada petición;
+    los clientes pueden reutilizar la copia `client_max_age` segundos.
+    """
+    if any(role in STAFF_ROLES for role in roles):
+        return "private, no-cache"
+    return f"private, max-age={client_max_age}, must-revalidate"
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
@@ -0,0 +1,223 @@
+# backend/app/common/metrics.py
+"""
+Métricas en memoria con formato de exposición de texto de Prometheus.
+
+No depende de ningún colector externo: cada worker acumula sus contadores e
+histogramas y los publica en `GET /api/metrics`. Incluye:
+
+- peticiones HTTP por ruta, método y estado, su latencia y las peticiones en curso;
+- número y duración de consultas a la BD por ruta;
+- duración, espera y rechazos del hash/verificación de contraseñas (bcrypt).
+"""
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+NO_ROUTE = "<none>"
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Scope ASGI de la petición en curso; el router de Starlette le añade "route"
+# al resolverla, así que cualquier código dentro de la petición puede saber
+# qué plantilla de ruta lo está ejecutando.
+_current_scope: ContextVar[Optional[dict]] = ContextVar("credinet_current_scope", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def render(self) -> List[str]:
+        values = self._callback() if self._callback else self._values
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [conteos por bucket..., conteo total, suma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * len(self.buckets) + [0, 0.0]
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[-2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            inf_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "credinet_http_requests_total", "Peticiones HTTP atendidas.", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "credinet_http_request_duration_seconds", "Latencia de las peticiones HTTP.", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "credinet_http_requests_in_flight", "Peticiones HTTP en curso."))
+DB_QUERIES = registry.register(Counter(
+    "credinet_db_queries_total", "Consultas ejecutadas contra la base de datos.", ("route",)))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "credinet_db_query_duration_seconds", "Duración de las consultas a la base de datos.", ("route",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+PASSWORD_HASHING_LATENCY = registry.register(Histogram(
+    "credinet_password_hashing_seconds", "Duración del hash/verificación de contraseñas (bcrypt).", ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)))
+PASSWORD_HASHING_WAIT = registry.register(Histogram(
+    "credinet_password_hashing_wait_seconds", "Espera en cola antes de hashear/verificar una contraseña.", ("operation",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+PASSWORD_HASHING_REJECTED = registry.register(Counter(
+    "credinet_password_hashing_rejected_total", "Operaciones de contraseña rechazadas por saturación (503).", ("operation",)))
+
+
+def register_stats_gauges(prefix: str, documentation: str, stats: Callable[[], dict]):
+    """Publica como gauges los valores numéricos de un diccionario de estadísticas."""
+    def collect():
+        return {(key,): float(value) for key, value in stats().items() if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    registry.register(Gauge(prefix, documentation, ("stat",), callback=collect))
+
+
+def current_route() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return NO_ROUTE
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def observe_db_query(duration: float):
+    route = current_route()
+    DB_QUERIES.inc(route)
+    DB_QUERY_LATENCY.observe(duration, route)
+
+
+def render() -> str:
+    return registry.render()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada petición HTTP por plantilla de ruta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = _current_scope.set(scope)
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            route = current_route()
+            HTTP_REQUESTS.inc(scope["method"], route, str(status_code))
+            HTTP_LATENCY.observe(elapsed, scope["method"], route)
+            _current_scope.reset(token)
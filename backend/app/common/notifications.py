@@ -0,0 +1,100 @@
+# backend/app/common/notifications.py
+"""
+Escucha de notificaciones de Postgres (LISTEN/NOTIFY) para invalidar cachés.
+
+Los triggers de la BD publican en un canal qué cambió (p. ej. el id del
+usuario cuyos préstamos o pagos se modificaron) y cada worker lo recibe por
+una conexión dedicada, fuera del pool. Así la invalidación alcanza a todos los
+workers y también a los cambios hechos fuera de la API (CLI, seeds, psql).
+
+Si la conexión se pierde, las notificaciones de ese intervalo no llegan: cada
+suscriptor recibe `on_reset` para vaciar su caché y la conexión se reintenta.
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.common import database
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 5
+
+
+class ChangeListener:
+    def __init__(self):
+        self.conn: Optional[asyncpg.Connection] = None
+        self.subscribers: Dict[str, List[Tuple[Callable[[str], None], Callable[[], None]]]] = {}
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def subscribe(self, channel: str, on_notify: Callable[[str], None], on_reset: Callable[[], None]) -> None:
+        """Registra un suscriptor; debe hacerse antes de `start()`."""
+        self.subscribers.setdefault(channel, []).append((on_notify, on_reset))
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None and not self.conn.is_closed()
+
+    async def start(self) -> None:
+        self._closing = False
+        try:
+            await self._connect()
+        except Exception as e:
+            logger.error(f"No se pudo iniciar la escucha de notificaciones: {e}")
+            self._schedule_reconnect()
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+    async def _connect(self) -> None:
+        conn = await asyncpg.connect(database.get_database_url())
+        for channel in self.subscribers:
+            await conn.add_listener(channel, self._dispatch)
+        conn.add_termination_listener(self._on_terminated)
+        self.conn = conn
+        # Lo que haya cambiado antes de escuchar no se notificó.
+        self._reset_all()
+
+    def _dispatch(self, conn, pid, channel: str, payload: str) -> None:
+        for on_notify, _ in self.subscribers.get(channel, []):
+            on_notify(payload)
+
+    def _reset_all(self) -> None:
+        for handlers in self.subscribers.values():
+            for _, on_reset in handlers:
+                on_reset()
+
+    def _on_terminated(self, conn) -> None:
+        self.conn = None
+        if self._closing:
+            return
+        logger.warning("Se perdió la conexión de notificaciones; se vacían los cachés y se reintenta.")
+        self._reset_all()
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None and not self._closing:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        try:
+            while not self._closing and not self.connected:
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+                try:
+                    await self._connect()
+                except Exception as e:
+                    logger.error(f"Reintento de conexión de notificaciones fallido: {e}")
+        finally:
+            self._reconnect_task = None
+
+
+change_listener = ChangeListener()
@@ -0,0 +1,43 @@
+# backend/app/common/pagination.py
+"""
+Utilidades de paginación por cursor (keyset) y conteo estimado.
+
+El cursor es opaco para el cliente: codifica la clave de orden de la última
+fila entregada, de modo que la siguiente página se obtiene con un
+`WHERE id < / > $n` indexado en lugar de un OFFSET que recorre filas.
+"""
+import base64
+import json
+import asyncpg
+from fastapi import HTTPException, status
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+        if not isinstance(last_id, int):
+            raise ValueError
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El cursor de paginación no es válido.")
+
+
+async def estimate_count(conn: asyncpg.Connection, select_query: str, *params) -> int:
+    """
+    Número de filas que el planificador estima para `select_query` (sin LIMIT),
+    usando las estadísticas de la tabla en lugar de un COUNT exacto.
+    """
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {select_query}", *params)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def page_count(total: int, limit: int) -> int:
+    return (total + limit - 1) // limit if limit > 0 else 0
@@ -0,0 +1,109 @@
+# backend/app/common/query_log.py
+"""
+Registro de consultas lentas.
+
+`InstrumentedConnection` llama a `record_query` tras cada consulta. Las que
+superan `SLOW_QUERY_THRESHOLD_MS` se registran en el log con su SQL
+normalizado, la ruta y la función que la lanzó, y se guardan en un buffer
+circular en memoria (`GET /api/utils/slow-queries`). Para una muestra de los
+SELECT lentos se captura además `EXPLAIN (ANALYZE, BUFFERS)`, lo que vuelve a
+ejecutar la consulta: por eso nunca se aplica a sentencias de escritura, y se
+hace en segundo plano con otra conexión del pool, en una transacción de sólo
+lectura y con tiempo límite, para no alargar la petición ni tocar su
+transacción. El plan aparece en la entrada cuando termina.
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+from collections import deque
+from datetime import datetime, timezone
+from typing import List
+
+from app.core.config import settings
+from app.common import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])\d+(?:\.\d+)?")
+_INTERNAL_FILES = {os.path.abspath(__file__), os.path.abspath(os.path.join(os.path.dirname(__file__), "database.py"))}
+_BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Como mucho unos pocos EXPLAIN a la vez: con la BD ya lenta no se le suma más carga.
+MAX_CONCURRENT_EXPLAINS = 2
+EXPLAIN_TIMEOUT_SECONDS = 10
+
+slow_queries = deque(maxlen=settings.SLOW_QUERY_LOG_SIZE)
+_explain_tasks = set()
+
+
+def normalize_sql(query: str) -> str:
+    """Colapsa espacios y sustituye literales por `?` para agrupar consultas iguales."""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def _caller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES and "asyncpg" not in filename:
+            return f"{os.path.relpath(filename, _BACKEND_ROOT)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "<desconocido>"
+
+
+def _is_read_only(query: str) -> bool:
+    words = query.split(None, 1)
+    return bool(words) and words[0].upper() == "SELECT" and "FOR UPDATE" not in query.upper()
+
+
+def record_query(query: str, args: tuple, duration: float) -> None:
+    if duration * 1000 < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration * 1000, 3),
+        "route": metrics.current_route(),
+        "caller": _caller(),
+        "query": normalize_sql(query),
+        "plan": None,
+    }
+    logger.warning(f"Consulta lenta ({entry['duration_ms']} ms) en {entry['route']} desde {entry['caller']}: {entry['query']}")
+
+    slow_queries.append(entry)
+
+    if (settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE > 0 and _is_read_only(query)
+            and len(_explain_tasks) < MAX_CONCURRENT_EXPLAINS
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE):
+        task = asyncio.create_task(_explain(entry, query, args))
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+
+
+async def _explain(entry: dict, query: str, args: tuple) -> None:
+    # Importación diferida: database importa este módulo.
+    from app.common import database
+
+    pool = database.db_pool
+    if pool is None:
+        return
+    try:
+        # Conexión cruda del pool: el EXPLAIN no debe registrarse a sí mismo como consulta lenta.
+        async with pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT) as conn:
+            async with conn.transaction(readonly=True):
+                rows = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args, timeout=EXPLAIN_TIMEOUT_SECONDS)
+        entry["plan"] = [row[0] for row in rows]
+    except Exception as e:
+        logger.info(f"No se pudo capturar EXPLAIN de una consulta lenta: {e}")
+
+
+def get_slow_queries() -> List[dict]:
+    """Consultas lentas más recientes primero."""
+    return list(reversed(slow_queries))
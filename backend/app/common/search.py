@@ -0,0 +1,23 @@
+# backend/app/common/search.py
+"""
+Fragmentos SQL para el Filtro Universal Simple.
+
+Las columnas buscables tienen índices GIN `gin_trgm_ops` (ver db/init.sql),
+que PostgreSQL usa directamente para `ILIKE '%término%'`; la relevancia se
+ordena con `word_similarity` de pg_trgm.
+"""
+from typing import List
+
+
+def like_pattern(term: str) -> str:
+    """Patrón `%término%` con los comodines de LIKE escapados."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def ilike_any(fields: List[str], placeholder: str) -> str:
+    return "(" + " OR ".join(f"{field} ILIKE {placeholder}" for field in fields) + ")"
+
+
+def similarity_rank(fields: List[str], placeholder: str) -> str:
+    return "GREATEST(" + ", ".join(f"word_similarity({placeholder}, COALESCE({field}, ''))" for field in fields) + ")"
@@ -14,6 +14,53 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+    # Contraseñas: costo de bcrypt y pool dedicado de hash/verificación
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+    # Caché en memoria del usuario autenticado (get_current_user)
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv("USER_CACHE_MAX_SIZE", 1024))
+
+    # Caché (LRU) de tablas de amortización
+    AMORTIZATION_CACHE_MAX_SIZE: int = int(os.getenv("AMORTIZATION_CACHE_MAX_SIZE", 4096))
+
+    # Caché del dashboard de cliente (se invalida por LISTEN/NOTIFY; el TTL es sólo un límite)
+    CLIENT_DASHBOARD_CACHE_TTL_SECONDS: float = float(os.getenv("CLIENT_DASHBOARD_CACHE_TTL_SECONDS", 900))
+    CLIENT_DASHBOARD_CACHE_MAX_SIZE: int = int(os.getenv("CLIENT_DASHBOARD_CACHE_MAX_SIZE", 10000))
+
+    # Pool de conexiones (por worker de uvicorn: max_size x workers <= max_connections de Postgres)
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", 10))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 10))
+    DB_POOL_MAX_QUERIES: int = int(os.getenv("DB_POOL_MAX_QUERIES", 50000))
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+    DB_COMMAND_TIMEOUT: float = float(os.getenv("DB_COMMAND_TIMEOUT", 0))
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+    DB_IDLE_IN_TRANSACTION_TIMEOUT_MS: int = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 0))
+    DB_APPLICATION_NAME: str = os.getenv("DB_APPLICATION_NAME", "credinet-api")
+
+    # Registro de consultas lentas (EXPLAIN ANALYZE sólo para una muestra de SELECT lentos; 0 lo desactiva)
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0))
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", 100))
+
+    # Códigos postales: API externa con caché local, o archivo de SEPOMEX sin conexión si se indica la ruta
+    ZIP_CODE_API_URL: str = os.getenv("ZIP_CODE_API_URL", "https://api.tau.com.mx/dipomex/v1/codigo_postal")
+    ZIP_CODE_API_KEY: str = os.getenv("ZIP_CODE_API_KEY", "77b8b04b005aaff3abe8300c9d43f503f73ffe26")
+    ZIP_CODE_API_TIMEOUT: float = float(os.getenv("ZIP_CODE_API_TIMEOUT", 5))
+    ZIP_CODE_CACHE_TTL_SECONDS: float = float(os.getenv("ZIP_CODE_CACHE_TTL_SECONDS", 86400))
+    ZIP_CODE_NEGATIVE_CACHE_TTL_SECONDS: float = float(os.getenv("ZIP_CODE_NEGATIVE_CACHE_TTL_SECONDS", 3600))
+    ZIP_CODE_CACHE_MAX_SIZE: int = int(os.getenv("ZIP_CODE_CACHE_MAX_SIZE", 10000))
+    ZIP_CODE_DATASET_PATH: str = os.getenv("ZIP_CODE_DATASET_PATH", "")
+
+    # Filtro de Bloom para /api/utils/check-availability (desactivado por defecto)
+    AVAILABILITY_FILTER_ENABLED: bool = os.getenv("AVAILABILITY_FILTER_ENABLED", "false").lower() in ("1", "true", "yes")
+    AVAILABILITY_FILTER_ERROR_RATE: float = float(os.getenv("AVAILABILITY_FILTER_ERROR_RATE", 0.01))
+    AVAILABILITY_FILTER_REFRESH_SECONDS: float = float(os.getenv("AVAILABILITY_FILTER_REFRESH_SECONDS", 600))
+
     # Database URL for testing
     TEST_DATABASE_URL: str = "postgresql+asyncpg://credinet_user:credinet_pass@db:5432/credinet_test_db"
 
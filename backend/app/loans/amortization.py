@@ -0,0 +1,149 @@
+"""
+Motor de amortización en forma cerrada.
+
+Calcula el pago periódico, el total a pagar y el desglose por periodo
+(capital, interés y saldo) como arreglos de NumPy, sin iterar fila por fila.
+`batch_payment_totals` procesa miles de préstamos en una sola llamada; la
+tabla completa como lista de diccionarios sólo se construye con
+`build_schedule`, cuando un endpoint realmente la necesita.
+"""
+import calendar
+from datetime import date
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+QUINCENAL = 'quincenal'
+
+
+class AmortizationArrays(NamedTuple):
+    payment_amount: float
+    principal: np.ndarray
+    interest: np.ndarray
+    balance: np.ndarray
+
+
+class PaymentTotals(NamedTuple):
+    payment_amount: np.ndarray
+    num_payments: np.ndarray
+    total_due: np.ndarray
+
+
+def _periods(term_months: np.ndarray, quincenal: np.ndarray):
+    periods_per_year = np.where(quincenal, 24, 12)
+    total_periods = np.where(quincenal, term_months * 2, term_months)
+    return periods_per_year, total_periods
+
+
+def _periodic_payment(amounts: np.ndarray, rates: np.ndarray, total_periods: np.ndarray) -> np.ndarray:
+    """Fórmula de anualidad: A·r / (1 - (1 + r)^-n), con A/n si el denominador es 0."""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        denominator = 1 - (1 + rates) ** -total_periods
+        safe_periods = np.where(total_periods > 0, total_periods, 1)
+        return np.where(denominator != 0, amounts * rates / np.where(denominator != 0, denominator, 1), amounts / safe_periods)
+
+
+def batch_payment_totals(
+    amounts: Sequence[float],
+    interest_rates: Sequence[float],
+    terms_months: Sequence[float],
+    payment_frequencies: Sequence[str],
+) -> PaymentTotals:
+    """
+    Calcula para muchos préstamos a la vez el pago periódico (redondeado),
+    el número de pagos y el total a pagar. Los préstamos sin cronograma válido
+    (tasa o plazo no positivos) devuelven 0 pagos y su monto como total.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    rates_pct = np.asarray(interest_rates, dtype=float)
+    terms = np.asarray(terms_months, dtype=float)
+    quincenal = np.asarray([freq == QUINCENAL for freq in payment_frequencies], dtype=bool).reshape(amounts.shape)
+
+    periods_per_year, total_periods = _periods(terms, quincenal)
+    num_payments = np.rint(total_periods).astype(int)
+    has_schedule = (rates_pct > 0) & (total_periods > 0) & (num_payments > 0)
+
+    rates = (rates_pct / 100) / periods_per_year
+    payment = _periodic_payment(amounts, rates, total_periods)
+    has_schedule &= np.isfinite(payment)
+
+    payment_amount = np.where(has_schedule, np.round(np.where(has_schedule, payment, 0), 2), 0.0)
+    num_payments = np.where(has_schedule, num_payments, 0)
+    total_due = np.where(has_schedule, payment_amount * num_payments, amounts)
+    return PaymentTotals(payment_amount, num_payments, total_due)
+
+
+def schedule_arrays(amount: float, interest_rate: float, term_months: float, payment_frequency: str = QUINCENAL) -> Optional[AmortizationArrays]:
+    """
+    Desglose por periodo en forma cerrada. El saldo tras k pagos es
+    A(1+r)^k - P((1+r)^k - 1)/r; el interés de cada periodo es r por el
+    saldo anterior. Devuelve None si el préstamo no genera cronograma.
+    """
+    quincenal = payment_frequency == QUINCENAL
+    periods_per_year = 24 if quincenal else 12
+    total_periods = term_months * 2 if quincenal else term_months
+
+    if interest_rate <= 0 or total_periods <= 0:
+        return None
+
+    num_payments = int(round(total_periods))
+    rate = (interest_rate / 100) / periods_per_year
+    payment = float(_periodic_payment(np.float64(amount), np.float64(rate), np.float64(total_periods)))
+    if num_payments <= 0 or not np.isfinite(payment):
+        return None
+
+    growth = (1 + rate) ** np.arange(num_payments + 1)
+    balances = amount * growth - payment * (growth - 1) / rate
+    interest = balances[:-1] * rate
+    principal = payment - interest
+    return AmortizationArrays(payment, principal, interest, balances[1:])
+
+
+def _shift_month(year: int, month: int, offset: int):
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def payment_dates(start_date: date, num_payments: int, payment_frequency: str = QUINCENAL) -> List[date]:
+    """
+    Fechas de pago sin aritmética de calendario fila por fila. Quincenal:
+    días 15 y 1 alternados a partir de `start_date`. Mensual: mismo día de
+    cada mes, recortado (de forma acumulada) al último día de meses cortos.
+    """
+    dates = []
+    if payment_frequency == QUINCENAL:
+        phase = 0 if start_date.day < 15 else 1
+        for i in range(num_payments):
+            step = i + phase
+            year, month = _shift_month(start_date.year, start_date.month, (step + 1) // 2)
+            dates.append(date(year, month, 15 if step % 2 == 0 else 1))
+    else:
+        day = start_date.day
+        for i in range(1, num_payments + 1):
+            year, month = _shift_month(start_date.year, start_date.month, i)
+            day = min(day, calendar.monthrange(year, month)[1])
+            dates.append(date(year, month, day))
+    return dates
+
+
+def build_schedule(amount: float, interest_rate: float, term_months: float, start_date: date, payment_frequency: str = QUINCENAL) -> List[dict]:
+    """Construye la tabla de amortización completa como lista de diccionarios."""
+    arrays = schedule_arrays(amount, interest_rate, term_months, payment_frequency)
+    if arrays is None:
+        return []
+
+    payment_amount = round(arrays.payment_amount, 2)
+    dates = payment_dates(start_date, len(arrays.balance), payment_frequency)
+    return [
+        {
+            "payment_number": i,
+            "payment_date": payment_date,
+            "payment_amount": payment_amount,
+            "principal": round(principal, 2),
+            "interest": round(interest, 2),
+            "balance": round(balance, 2) if balance > 0 else 0,
+        }
+        for i, (payment_date, principal, interest, balance) in enumerate(
+            zip(dates, arrays.principal.tolist(), arrays.interest.tolist(), arrays.balance.tolist()), start=1
+        )
+    ]
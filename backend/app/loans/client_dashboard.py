@@ -0,0 +1,110 @@
+"""
+Dashboard del cliente (`GET /api/auth/me/dashboard`).
+
+Se arma con una sola consulta: sus préstamos con saldo pendiente y sus
+últimos pagos, agregados como JSON. La respuesta ya serializada se guarda por
+usuario y se invalida cuando los triggers de `loans`/`payments` notifican un
+cambio de ese usuario (canal `client_dashboard_changes`). Sin la escucha de
+notificaciones activa no se usa el caché, para no servir datos viejos.
+"""
+import json
+
+import asyncpg
+
+from app.core.config import settings
+from app.common import database, metrics
+from app.common.cache import TTLCache
+from app.common.notifications import change_listener
+from app.loans.schemas import ClientDashboardResponse
+from app.logic import LOAN_TERMS_LATERAL_SQL, LOAN_TOTAL_DUE_SQL
+
+NOTIFY_CHANNEL = "client_dashboard_changes"
+
+CLIENT_DASHBOARD_QUERY = f"""
+SELECT
+    (
+        SELECT COALESCE(json_agg(json_build_object(
+            'id', l.id,
+            'amount', l.amount,
+            'status', l.status,
+            'outstanding_balance', ROUND(COALESCE(s.scheduled_total_due, {LOAN_TOTAL_DUE_SQL}) - COALESCE(b.total_paid, 0), 2)
+        ) ORDER BY l.id), '[]'::json)
+        FROM loans l
+        {LOAN_TERMS_LATERAL_SQL}
+        LEFT JOIN loan_balances b ON b.loan_id = l.id
+        LEFT JOIN LATERAL (
+            SELECT SUM(amount) AS scheduled_total_due FROM loan_schedule WHERE loan_id = l.id
+        ) s ON TRUE
+        WHERE l.user_id = $1
+    ) AS loans,
+    (
+        SELECT COALESCE(json_agg(p ORDER BY p.payment_date DESC), '[]'::json)
+        FROM (
+            SELECT p.id, p.loan_id, p.amount_paid, p.payment_date
+            FROM payments p
+            JOIN loans l ON p.loan_id = l.id
+            WHERE l.user_id = $1
+            ORDER BY p.payment_date DESC
+            LIMIT 5
+        ) p
+    ) AS recent_payments
+"""
+
+dashboard_cache = TTLCache(maxsize=settings.CLIENT_DASHBOARD_CACHE_MAX_SIZE, ttl=settings.CLIENT_DASHBOARD_CACHE_TTL_SECONDS)
+metrics.register_stats_gauges("credinet_client_dashboard_cache", "Caché de dashboards de cliente de este worker.", dashboard_cache.stats)
+
+# Se incrementa con cada invalidación: una respuesta calculada mientras llegó
+# una notificación podría ser anterior al cambio y no se guarda.
+_generation = 0
+
+
+def invalidate_client_dashboard(user_id: int) -> None:
+    global _generation
+    _generation += 1
+    dashboard_cache.pop(user_id)
+
+
+def _on_notify(payload: str) -> None:
+    invalidate_client_dashboard(int(payload))
+
+
+def _on_reset() -> None:
+    global _generation
+    _generation += 1
+    dashboard_cache.clear()
+
+
+change_listener.subscribe(NOTIFY_CHANNEL, _on_notify, _on_reset)
+
+
+async def build_client_dashboard(conn: asyncpg.Connection, user_id: int) -> ClientDashboardResponse:
+    record = await conn.fetchrow(CLIENT_DASHBOARD_QUERY, user_id)
+    loans = json.loads(record['loans'])
+    active_loans = [loan for loan in loans if loan['status'] == 'active']
+    return ClientDashboardResponse.model_validate({
+        "summary": {
+            "active_loans_count": len(active_loans),
+            "total_outstanding_balance": sum(loan['outstanding_balance'] for loan in active_loans),
+        },
+        "loans": loans,
+        "recent_payments": json.loads(record['recent_payments']),
+    })
+
+
+async def get_client_dashboard_json(user_id: int) -> bytes:
+    """
+    Dashboard del usuario serializado a JSON. Si está en caché no se toma
+    ninguna conexión del pool.
+    """
+    use_cache = change_listener.connected
+    if use_cache:
+        cached = dashboard_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    generation = _generation
+    async with database.get_db_context() as conn:
+        body = (await build_client_dashboard(conn, user_id)).model_dump_json().encode()
+    if use_cache and generation == _generation:
+        dashboard_cache.set(user_id, body)
+    return body
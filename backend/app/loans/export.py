@@ -0,0 +1,46 @@
+"""
+Exportación de la cartera de préstamos enriquecida en CSV o NDJSON.
+
+Las filas se leen por bloques con `iter_enriched_loans` y se serializan a
+medida que se envían, así que la memoria del worker no crece con la cartera.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, List
+
+EXPORT_COLUMNS = (
+    'id', 'user_id', 'user_first_name', 'user_last_name', 'associate_id', 'amount', 'interest_rate',
+    'commission_rate', 'term_months', 'payment_frequency', 'status', 'created_at', 'updated_at',
+    'payments_made', 'total_paid', 'last_payment_date', 'outstanding_balance',
+)
+
+MEDIA_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+
+def _export_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows: List[List]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def export_lines(chunks: AsyncIterator[List[dict]], fmt: str) -> AsyncIterator[str]:
+    """Convierte bloques de préstamos enriquecidos en texto CSV (con encabezado) o NDJSON."""
+    if fmt == 'csv':
+        yield _csv_lines([EXPORT_COLUMNS])
+    async for loans in chunks:
+        rows = [[_export_value(loan.get(column)) for column in EXPORT_COLUMNS] for loan in loans]
+        if fmt == 'csv':
+            yield _csv_lines(rows)
+        else:
+            yield "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows)
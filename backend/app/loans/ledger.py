@@ -0,0 +1,97 @@
+"""
+Verificación y reconstrucción del libro mayor `loan_balances` y del resumen
+por asociado `associate_portfolio_stats`.
+
+Los triggers de `payments` y `loans` mantienen los agregados al día; estas
+funciones los comparan contra las tablas base y reparan cualquier desviación.
+"""
+import asyncpg
+from typing import List, Optional
+
+ACTUAL_BALANCES_CTE = """
+WITH actual AS (
+    SELECT
+        l.id AS loan_id,
+        COUNT(p.id)::int AS payments_made,
+        COALESCE(SUM(p.amount_paid), 0.00) AS total_paid,
+        MAX(p.payment_date) AS last_payment_date
+    FROM loans l
+    LEFT JOIN payments p ON p.loan_id = l.id
+    {where_clause}
+    GROUP BY l.id
+)
+"""
+
+async def find_loan_balance_drift(conn: asyncpg.Connection) -> List[dict]:
+    """Devuelve los préstamos cuyo registro en `loan_balances` no coincide con sus pagos."""
+    query = ACTUAL_BALANCES_CTE.format(where_clause="") + """
+    SELECT
+        a.loan_id,
+        b.payments_made AS ledger_payments_made, a.payments_made,
+        b.total_paid AS ledger_total_paid, a.total_paid,
+        b.last_payment_date AS ledger_last_payment_date, a.last_payment_date
+    FROM actual a
+    LEFT JOIN loan_balances b ON b.loan_id = a.loan_id
+    WHERE (COALESCE(b.payments_made, 0), COALESCE(b.total_paid, 0.00), b.last_payment_date)
+          IS DISTINCT FROM (a.payments_made, a.total_paid, a.last_payment_date)
+    ORDER BY a.loan_id
+    """
+    records = await conn.fetch(query)
+    return [dict(record) for record in records]
+
+async def rebuild_loan_balances(conn: asyncpg.Connection, loan_ids: Optional[List[int]] = None) -> int:
+    """
+    Recalcula `loan_balances` desde `payments` (todos los préstamos o sólo
+    `loan_ids`). Bloquea escrituras en `payments` mientras dura la transacción
+    para que ningún trigger concurrente quede fuera del recálculo.
+    Devuelve el número de filas escritas.
+    """
+    params = []
+    where_clause = ""
+    if loan_ids is not None:
+        params.append(loan_ids)
+        where_clause = "WHERE l.id = ANY($1::int[])"
+
+    query = ACTUAL_BALANCES_CTE.format(where_clause=where_clause) + """
+    INSERT INTO loan_balances (loan_id, payments_made, total_paid, last_payment_date)
+    SELECT loan_id, payments_made, total_paid, last_payment_date FROM actual
+    ON CONFLICT (loan_id) DO UPDATE SET
+        payments_made = EXCLUDED.payments_made,
+        total_paid = EXCLUDED.total_paid,
+        last_payment_date = EXCLUDED.last_payment_date,
+        updated_at = NOW()
+    WHERE (loan_balances.payments_made, loan_balances.total_paid, loan_balances.last_payment_date)
+          IS DISTINCT FROM (EXCLUDED.payments_made, EXCLUDED.total_paid, EXCLUDED.last_payment_date)
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE payments IN SHARE MODE")
+        status = await conn.execute(query, *params)
+    return int(status.split()[-1])
+
+async def rebuild_associate_stats(conn: asyncpg.Connection) -> int:
+    """
+    Recalcula `associate_portfolio_stats` desde `loans` y `loan_balances`
+    (p. ej. al migrar una BD que ya tenía préstamos). Devuelve el número de
+    asociados con cartera.
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE loans, loan_balances IN SHARE MODE")
+        await conn.execute("DELETE FROM associate_portfolio_stats")
+        status = await conn.execute(
+            """
+            INSERT INTO associate_portfolio_stats (associate_id, total_loans, active_loans, total_loaned_amount, total_due, total_paid, total_commission)
+            SELECT
+                l.associate_id,
+                COUNT(*),
+                COUNT(*) FILTER (WHERE l.status = 'active'),
+                SUM(l.amount),
+                SUM(loan_total_due(l.amount, l.interest_rate, l.term_months, l.payment_frequency)),
+                COALESCE(SUM(b.total_paid), 0.00),
+                SUM(l.amount * l.commission_rate / 100.0)
+            FROM loans l
+            LEFT JOIN loan_balances b ON b.loan_id = l.id
+            WHERE l.associate_id IS NOT NULL
+            GROUP BY l.associate_id
+            """
+        )
+    return int(status.split()[-1])
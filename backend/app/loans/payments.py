@@ -0,0 +1,115 @@
+"""
+Registro de pagos por lotes (corte de quincena).
+
+Todo el lote se resuelve en una transacción con un número fijo de viajes a la
+BD, sin importar cuántos pagos traiga: bloqueo de los préstamos, lectura de
+sus saldos, reserva de ids, COPY de los pagos y relectura de los saldos (que
+actualiza el trigger de `loan_balances`).
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+
+import asyncpg
+
+from app.loans import amortization
+from app.loans.schemas import BatchPaymentItem, BatchPaymentResponse, BatchPaymentResult, LoanBalanceResponse
+from app.logic import get_enriched_loans
+
+PAYMENT_COLUMNS = ('id', 'loan_id', 'amount_paid', 'payment_date')
+
+# Tolerancia de redondeo al comparar contra el saldo pendiente.
+CENT = 0.005
+
+
+def _installment_amounts(loans: Dict[int, dict]) -> Dict[int, float]:
+    """Cuota periódica de cada préstamo, para los pagos que no indican monto."""
+    loan_ids = list(loans)
+    if not loan_ids:
+        return {}
+    totals = amortization.batch_payment_totals(
+        [float(loans[loan_id]['amount']) for loan_id in loan_ids],
+        [float(loans[loan_id]['interest_rate']) for loan_id in loan_ids],
+        [float(loans[loan_id]['term_months']) for loan_id in loan_ids],
+        [loans[loan_id]['payment_frequency'] for loan_id in loan_ids],
+    )
+    return dict(zip(loan_ids, (float(amount) for amount in totals.payment_amount)))
+
+
+async def post_payments(
+    conn: asyncpg.Connection,
+    items: Sequence[BatchPaymentItem],
+    associate_id: Optional[int] = None,
+) -> BatchPaymentResponse:
+    """
+    Registra los pagos válidos de `items` y reporta el resultado de cada fila.
+    Si se indica `associate_id`, sólo se aceptan pagos de préstamos de ese
+    asociado. Los pagos sin monto toman la cuota del préstamo, acotada al saldo.
+    """
+    results = [BatchPaymentResult(index=index, loan_id=item.loan_id) for index, item in enumerate(items)]
+    loan_ids = sorted({item.loan_id for item in items})
+
+    async with conn.transaction():
+        # Bloquea los préstamos (en orden, para no provocar deadlocks entre
+        # lotes) para que dos cortes simultáneos no excedan el saldo.
+        await conn.execute("SELECT 1 FROM loans WHERE id = ANY($1::int[]) ORDER BY id FOR UPDATE", loan_ids)
+        loans = {loan['id']: loan for loan in await get_enriched_loans(conn, loan_ids)}
+        installments = _installment_amounts(loans)
+        remaining = {loan_id: loan['outstanding_balance'] for loan_id, loan in loans.items()}
+
+        accepted: List[BatchPaymentResult] = []
+        for item, result in zip(items, results):
+            loan = loans.get(item.loan_id)
+            if loan is None:
+                result.error = "El préstamo no existe."
+                continue
+            if associate_id is not None and loan['associate_id'] != associate_id:
+                result.error = "No tienes permiso para registrar pagos de este préstamo."
+                continue
+            if loan['status'] != 'active':
+                result.error = f"El préstamo no está activo (estado: {loan['status']})."
+                continue
+            amount = item.amount_paid
+            if amount is None:
+                amount = min(installments[item.loan_id], remaining[item.loan_id])
+                if amount <= 0:
+                    result.error = "Indica amount_paid: el préstamo no tiene una cuota pendiente."
+                    continue
+            if amount > remaining[item.loan_id] + CENT:
+                result.error = f"El pago excede el saldo pendiente ({remaining[item.loan_id]:.2f})."
+                continue
+            amount = round(amount, 2)
+            if amount < 0.01:
+                result.error = "El monto debe ser de al menos 0.01."
+                continue
+            remaining[item.loan_id] = round(remaining[item.loan_id] - amount, 2)
+            result.amount_paid = amount
+            result.payment_date = item.payment_date
+            accepted.append(result)
+
+        if accepted:
+            # Se reservan los ids de antemano para poder cargar con COPY y aun
+            # así devolver el id de cada pago.
+            payment_ids = await conn.fetch(
+                "SELECT nextval(pg_get_serial_sequence('payments', 'id')) AS id FROM generate_series(1, $1)",
+                len(accepted)
+            )
+            for result, record in zip(accepted, payment_ids):
+                result.payment_id = record['id']
+            await conn.copy_records_to_table(
+                'payments', columns=PAYMENT_COLUMNS,
+                records=[
+                    (result.payment_id, result.loan_id, Decimal(str(result.amount_paid)), result.payment_date)
+                    for result in accepted
+                ]
+            )
+
+        affected_ids = sorted({result.loan_id for result in accepted})
+        balances = [
+            LoanBalanceResponse(
+                loan_id=loan['id'], payments_made=loan['payments_made'],
+                total_paid=loan['total_paid'], outstanding_balance=loan['outstanding_balance'],
+            )
+            for loan in await get_enriched_loans(conn, affected_ids)
+        ]
+
+    return BatchPaymentResponse(created=len(accepted), results=results, balances=balances)
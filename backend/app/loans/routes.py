@@ -1,13 +1,20 @@
-from typing import List, Optional
+from datetime import date
+from typing import List, Literal, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 import asyncpg
 
 from app.auth.jwt import get_current_user, require_roles
-from app.common.database import get_db
+from app.common.database import get_db, get_db_context
+from app.common.http_cache import cache_control_for, etag_matches, make_etag, not_modified
+from app.common.pagination import decode_cursor, encode_cursor, estimate_count, page_count
+from app.common.search import ilike_any, like_pattern
 from app.loans import schemas
-from app.loans.utils import calculate_amortization_schedule
-from app.logic import get_enriched_loan
+from app.loans.export import MEDIA_TYPES, export_lines
+from app.loans.payments import post_payments
+from app.loans.schedules import current_quincena, get_loan_schedule, materialize_active_schedules
+from app.logic import get_enriched_loan, get_enriched_loans, get_loan_summary, iter_enriched_loans
 from app.auth.schemas import UserInDB
 
 class PaginatedLoanResponse(BaseModel):
@@ -16,6 +23,8 @@ class PaginatedLoanResponse(BaseModel):
     page: int
     limit: int
     pages: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 router = APIRouter()
 
@@ -24,18 +33,7 @@ async def get_global_loan_summary(
     conn: asyncpg.Connection = Depends(get_db),
     current_user: UserInDB = Depends(require_roles(["administrador", "auxiliar_administrativo", "asociado"]))
 ):
-    query = "SELECT id FROM loans"
-    loan_ids_records = await conn.fetch(query)
-    summary = {"total_loans": len(loan_ids_records), "active_loans": 0, "total_loaned_amount": 0.0, "total_outstanding_balance": 0.0, "total_commission": 0.0}
-    for record in loan_ids_records:
-        enriched_loan = await get_enriched_loan(conn, record['id'])
-        if not enriched_loan: continue
-        summary["total_loaned_amount"] += float(enriched_loan['amount'])
-        summary["total_outstanding_balance"] += float(enriched_loan['outstanding_balance'])
-        if enriched_loan['status'] == 'active': summary["active_loans"] += 1
-        commission = float(enriched_loan['amount']) * (float(enriched_loan.get('commission_rate', 0) or 0) / 100.0)
-        summary["total_commission"] += commission
-    return schemas.GlobalLoanSummaryResponse(**summary)
+    return await get_loan_summary(conn)
 
 @router.get("/", response_model=PaginatedLoanResponse)
 async def get_loans(
@@ -45,6 +43,8 @@ async def get_loans(
     search: str = None,
     page: int = 1,
     limit: int = 20,
+    after: Optional[str] = None,
+    estimate_total: bool = False,
     conn: asyncpg.Connection = Depends(get_db),
     current_user: UserInDB = Depends(get_current_user)
 ):
@@ -58,85 +58,234 @@ async def get_loans(
     # Filtros existentes
     if "asociado" in current_user.roles:
         params.append(current_user.associate_id)
-        conditions.append(f"l.associate_id = ${len(params) + 1}")
+        conditions.append(f"l.associate_id = ${len(params)}")
     if user_id:
         params.append(user_id)
-        conditions.append(f"l.user_id = ${len(params) + 1}")
+        conditions.append(f"l.user_id = ${len(params)}")
     if status:
         params.append(status)
-        conditions.append(f"l.status = ${len(params) + 1}")
+        conditions.append(f"l.status = ${len(params)}")
     
     if search:
         search_terms = search.split()
         search_conditions = []
         for term in search_terms:
-            params.append(f"%{term}%")
-            search_conditions.append(f"(u.first_name ILIKE ${len(params)} OR u.last_name ILIKE ${len(params)})")
+            params.append(like_pattern(term))
+            search_conditions.append(ilike_any(["u.first_name", "u.last_name"], f"${len(params)}"))
         conditions.append(" AND ".join(search_conditions))
 
     where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     
-    total_query = f"SELECT COUNT(l.id) {base_from_clause}{join_clause} {where_clause}"
-    total_records = await conn.fetchval(total_query, *params)
-    
-    params.append(limit)
+    if estimate_total:
+        total_records = await estimate_count(conn, f"SELECT l.id {base_from_clause}{join_clause} {where_clause}", *params)
+    else:
+        total_query = f"SELECT COUNT(l.id) {base_from_clause}{join_clause} {where_clause}"
+        total_records = await conn.fetchval(total_query, *params)
+
+    # Modo cursor: busca por clave (l.id < último id entregado) en lugar de OFFSET.
+    if after:
+        params.append(decode_cursor(after))
+        conditions.append(f"l.id < ${len(params)}")
+        where_clause = f"WHERE {' AND '.join(conditions)}"
+        offset = 0
+
+    # Con búsqueda (y sin cursor) los resultados se ordenan por relevancia.
+    ranked = bool(search) and not after
+    order_sql = "l.id DESC"
+    if ranked:
+        params.append(search)
+        order_sql = f"word_similarity(${len(params)}, u.first_name || ' ' || u.last_name) DESC, l.id DESC"
+
+    params.append(limit + 1)
     params.append(offset)
-    ids_query = f"SELECT l.id {base_from_clause}{join_clause} {where_clause} ORDER BY l.id DESC LIMIT ${len(params)-1} OFFSET ${len(params)}"
+    ids_query = f"SELECT l.id {base_from_clause}{join_clause} {where_clause} ORDER BY {order_sql} LIMIT ${len(params)-1} OFFSET ${len(params)}"
     
     loan_ids_records = await conn.fetch(ids_query, *params)
+    loan_ids = [r['id'] for r in loan_ids_records[:limit]]
+    next_cursor = encode_cursor(loan_ids[-1]) if not ranked and loan_ids and len(loan_ids_records) > limit else None
     
-    enriched_loans = [await get_enriched_loan(conn, r['id']) for r in loan_ids_records if await get_enriched_loan(conn, r['id'])]
+    enriched_loans = await get_enriched_loans(conn, loan_ids)
     
     return {
         "items": enriched_loans, "total": total_records, "page": page, "limit": limit,
-        "pages": (total_records + limit - 1) // limit if limit > 0 else 0
+        "pages": page_count(total_records, limit),
+        "next_cursor": next_cursor, "total_is_estimate": estimate_total
     }
 
+@router.get("/export")
+async def export_loans(
+    format: Literal['csv', 'ndjson'] = 'csv',
+    user_id: Optional[int] = None,
+    status: Optional[str] = None,
+    current_user: UserInDB = Depends(require_roles(["administrador", "auxiliar_administrativo", "asociado"]))
+):
+    """
+    Descarga toda la cartera enriquecida (prestatario, pagos realizados, total
+    pagado y saldo pendiente) en CSV o NDJSON. Se envía en streaming desde un
+    cursor del servidor; los asociados sólo exportan sus propios préstamos.
+    """
+    params = []
+    conditions = []
+    if "asociado" in current_user.roles:
+        params.append(current_user.associate_id)
+        conditions.append(f"l.associate_id = ${len(params)}")
+    if user_id:
+        params.append(user_id)
+        conditions.append(f"l.user_id = ${len(params)}")
+    if status:
+        params.append(status)
+        conditions.append(f"l.status = ${len(params)}")
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    # La conexión se toma dentro del generador para que viva mientras dura la descarga.
+    async def stream():
+        async with get_db_context() as conn:
+            async for text in export_lines(iter_enriched_loans(conn, where_clause, params), format):
+                yield text
+
+    return StreamingResponse(
+        stream(), media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="prestamos.{format}"'}
+    )
+
+@router.get("/installments/due", response_model=List[schemas.DueInstallmentResponse])
+async def get_due_installments(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    conn: asyncpg.Connection = Depends(get_db),
+    current_user: UserInDB = Depends(require_roles(["administrador", "auxiliar_administrativo", "asociado"]))
+):
+    """
+    Cuotas pendientes de préstamos activos con vencimiento en el rango dado
+    (por defecto, la quincena actual). Lee `loan_schedule` por su índice de fechas,
+    tras materializar los calendarios que falten (hasta MAX_SCHEDULES_PER_REQUEST
+    préstamos por petición; más allá se avisa en el log y se completan con
+    `python cli.py backfill-schedules`).
+    """
+    default_from, default_to = current_quincena(date.today())
+    params = [from_date or default_from, to_date or default_to]
+    associate_filter = ""
+    is_admin_or_dev = any(role in current_user.roles for role in ["administrador", "auxiliar_administrativo", "desarrollador"])
+    if not is_admin_or_dev:
+        if current_user.associate_id is None:
+            return []
+        params.append(current_user.associate_id)
+        associate_filter = f"AND l.associate_id = ${len(params)}"
+
+    await materialize_active_schedules(conn, params[0], params[1], None if is_admin_or_dev else current_user.associate_id)
+
+    records = await conn.fetch(
+        f"""
+        SELECT s.loan_id, s.payment_number, s.due_date, s.amount, l.user_id, l.associate_id,
+               u.first_name AS user_first_name, u.last_name AS user_last_name
+        FROM loan_schedule s
+        JOIN loans l ON l.id = s.loan_id
+        JOIN users u ON u.id = l.user_id
+        LEFT JOIN loan_balances b ON b.loan_id = s.loan_id
+        WHERE s.due_date BETWEEN $1 AND $2
+          AND l.status = 'active'
+          AND s.payment_number > COALESCE(b.payments_made, 0)
+          {associate_filter}
+        ORDER BY s.due_date, s.loan_id
+        """,
+        *params
+    )
+    return [dict(record) for record in records]
+
+@router.post("/payments/batch", response_model=schemas.BatchPaymentResponse)
+async def post_payment_batch(
+    batch: schemas.BatchPaymentRequest,
+    conn: asyncpg.Connection = Depends(get_db),
+    current_user: UserInDB = Depends(require_roles(["administrador", "auxiliar_administrativo", "asociado"]))
+):
+    """
+    Registra los pagos de un corte en una sola petición y transacción.
+    Devuelve el resultado de cada fila (id del pago o error) y los saldos
+    actualizados de los préstamos afectados.
+    """
+    is_admin_or_dev = any(role in current_user.roles for role in ["administrador", "auxiliar_administrativo", "desarrollador"])
+    if is_admin_or_dev:
+        return await post_payments(conn, batch.payments)
+    if current_user.associate_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Tu usuario no está vinculado a un asociado.")
+    return await post_payments(conn, batch.payments, associate_id=current_user.associate_id)
+
+LOAN_VERSION_QUERY = """
+SELECT l.user_id, l.associate_id, l.updated_at, u.updated_at AS user_updated_at,
+       b.updated_at AS balance_updated_at, b.payments_made, b.total_paid
+FROM loans l
+JOIN users u ON u.id = l.user_id
+LEFT JOIN loan_balances b ON b.loan_id = l.id
+WHERE l.id = $1
+"""
+
+def _check_loan_access(current_user: UserInDB, loan, detail: str):
+    # Los administradores y desarrolladores pueden ver todo
+    is_admin_or_dev = any(role in current_user.roles for role in ["administrador", "desarrollador"])
+
+    if not is_admin_or_dev:
+        if "cliente" in current_user.roles and loan['user_id'] != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        if "asociado" in current_user.roles and loan['associate_id'] != current_user.associate_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+
 @router.get("/{loan_id}", response_model=schemas.LoanWithPaymentsResponse)
 async def get_loan_details(
     loan_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     conn: asyncpg.Connection = Depends(get_db),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    enriched_loan = await get_enriched_loan(conn, loan_id)
-    if not enriched_loan:
+    """
+    Préstamo enriquecido con sus pagos. Admite GET condicional: el ETag cambia
+    con el préstamo, el prestatario o cualquier pago (vía `loan_balances`), y
+    si coincide se responde 304 sin enriquecer ni serializar.
+    """
+    version = await conn.fetchrow(LOAN_VERSION_QUERY, loan_id)
+    if not version:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Préstamo con id {loan_id} no encontrado.")
+    _check_loan_access(current_user, version, "No tienes permiso para ver este préstamo.")
 
-    # Los administradores y desarrolladores pueden ver todo
-    is_admin_or_dev = any(role in current_user.roles for role in ["administrador", "desarrollador"])
+    etag = make_etag("loan", loan_id, *version.values())
+    cache_control = cache_control_for(current_user.roles, client_max_age=30)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
 
-    if not is_admin_or_dev:
-        if "cliente" in current_user.roles and enriched_loan.get('user_id') != current_user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para ver este préstamo.")
-        if "asociado" in current_user.roles and enriched_loan.get('associate_id') != current_user.associate_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para ver este préstamo.")
+    enriched_loan = await get_enriched_loan(conn, loan_id)
+    if not enriched_loan:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Préstamo con id {loan_id} no encontrado.")
 
     payments_records = await conn.fetch("SELECT * FROM payments WHERE loan_id = $1 ORDER BY payment_date DESC", loan_id)
     response_data = enriched_loan
     response_data['payments'] = [dict(p) for p in payments_records]
-    return schemas.LoanWithPaymentsResponse.model_validate(response_data)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response_data
 
 @router.get("/{loan_id}/schedule", response_model=schemas.AmortizationScheduleResponse)
 async def get_loan_amortization_schedule(
     loan_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     conn: asyncpg.Connection = Depends(get_db),
     current_user: UserInDB = Depends(get_current_user)
 ):
+    """
+    Tabla de amortización del préstamo. Sólo depende de sus términos, así que
+    el ETag se deriva de `loans.updated_at`.
+    """
     loan_record = await conn.fetchrow("SELECT * FROM loans WHERE id = $1", loan_id)
     if not loan_record:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Préstamo con id {loan_id} no encontrado.")
+    _check_loan_access(current_user, loan_record, "No tienes permiso para ver este cronograma.")
 
-    is_admin_or_dev = any(role in current_user.roles for role in ["administrador", "desarrollador"])
+    etag = make_etag("schedule", loan_id, loan_record['updated_at'])
+    cache_control = cache_control_for(current_user.roles, client_max_age=300)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, cache_control)
 
-    if not is_admin_or_dev:
-        if "cliente" in current_user.roles and loan_record['user_id'] != current_user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para ver este cronograma.")
-        if "asociado" in current_user.roles and loan_record['associate_id'] != current_user.associate_id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permiso para ver este cronograma.")
-            
-    schedule = calculate_amortization_schedule(
-        amount=float(loan_record['amount']), interest_rate=float(loan_record['interest_rate']),
-        term_months=float(loan_record['term_months']), start_date=loan_record['created_at'].date(),
-        payment_frequency=loan_record['payment_frequency']
-    )
-    return schemas.AmortizationScheduleResponse(schedule=schedule)
+    schedule = await get_loan_schedule(conn, loan_record)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return {"schedule": schedule}
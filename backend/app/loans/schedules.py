@@ -0,0 +1,134 @@
+"""
+Tablas de amortización materializadas en `loan_schedule`.
+
+Las filas se escriben la primera vez que se necesitan (o con
+`python cli.py backfill-schedules`) y un trigger de `loans` las borra cuando
+cambian los términos del préstamo, para que se regeneren en la siguiente
+lectura; los reportes por fecha regeneran antes las que falten
+(`materialize_active_schedules`). Así las fechas de vencimiento y los saldos se pueden consultar en SQL.
+"""
+import asyncpg
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, List, Mapping, Optional
+
+from app.loans.utils import calculate_amortization_schedule
+
+logger = logging.getLogger(__name__)
+
+# Préstamos cuya tabla se puede generar dentro de una petición de reporte.
+MAX_SCHEDULES_PER_REQUEST = 500
+
+INSERT_SCHEDULE_QUERY = """
+INSERT INTO loan_schedule (loan_id, payment_number, due_date, amount, principal, interest, balance)
+SELECT * FROM unnest($1::int[], $2::int[], $3::date[], $4::numeric[], $5::numeric[], $6::numeric[], $7::numeric[])
+ON CONFLICT (loan_id, payment_number) DO NOTHING
+"""
+
+SELECT_SCHEDULE_QUERY = """
+SELECT payment_number, due_date AS payment_date, amount AS payment_amount, principal, interest, balance
+FROM loan_schedule
+WHERE loan_id = $1
+ORDER BY payment_number
+"""
+
+def _schedule_for(loan: Mapping):
+    return calculate_amortization_schedule(
+        amount=float(loan['amount']), interest_rate=float(loan['interest_rate']),
+        term_months=float(loan['term_months']), start_date=loan['created_at'].date(),
+        payment_frequency=loan['payment_frequency']
+    )
+
+async def store_loan_schedules(conn: asyncpg.Connection, loans: Iterable[Mapping]) -> int:
+    """
+    Escribe la tabla de amortización de cada préstamo (registros de `loans`) en
+    una sola sentencia. Las filas ya existentes se conservan. Devuelve el número
+    de filas generadas.
+    """
+    columns = ([], [], [], [], [], [], [])
+    for loan in loans:
+        for row in _schedule_for(loan):
+            values = (loan['id'], row['payment_number'], row['payment_date'], *(
+                Decimal(str(row[key])) for key in ('payment_amount', 'principal', 'interest', 'balance')
+            ))
+            for column, value in zip(columns, values):
+                column.append(value)
+    if not columns[0]:
+        return 0
+    await conn.execute(INSERT_SCHEDULE_QUERY, *columns)
+    return len(columns[0])
+
+async def get_loan_schedule(conn: asyncpg.Connection, loan: Mapping) -> List[dict]:
+    """Lee la tabla de amortización de `loan_schedule`, materializándola si aún no existe."""
+    records = await conn.fetch(SELECT_SCHEDULE_QUERY, loan['id'])
+    if records:
+        return [dict(record) for record in records]
+    await store_loan_schedules(conn, [loan])
+    return [dict(row) for row in _schedule_for(loan)]
+
+async def backfill_loan_schedules(conn: asyncpg.Connection, batch_size: int = 1000) -> int:
+    """Materializa las tablas de amortización que falten, por lotes de préstamos."""
+    written = 0
+    last_id = 0
+    while True:
+        loans = await conn.fetch(
+            """
+            SELECT l.id, l.amount, l.interest_rate, l.term_months, l.payment_frequency, l.created_at
+            FROM loans l
+            WHERE l.id > $1 AND NOT EXISTS (SELECT 1 FROM loan_schedule s WHERE s.loan_id = l.id)
+            ORDER BY l.id
+            LIMIT $2
+            """,
+            last_id, batch_size
+        )
+        if not loans:
+            return written
+        written += await store_loan_schedules(conn, loans)
+        last_id = loans[-1]['id']
+
+async def materialize_active_schedules(conn: asyncpg.Connection, since: date, until: date,
+                                       associate_id: Optional[int] = None, limit: int = MAX_SCHEDULES_PER_REQUEST) -> int:
+    """
+    Escribe la tabla de amortización de los préstamos activos que pueden tener
+    cuotas entre `since` y `until` (opcionalmente de un asociado) y aún no la
+    tienen: nunca se consultó su calendario, se cargaron fuera de la API o el
+    trigger la borró al cambiar sus términos. Los reportes que leen
+    `loan_schedule` la llaman antes para no omitirlos.
+
+    Corre dentro de la petición, así que escribe como mucho `limit`
+    préstamos; si faltan más (BD migrada o recién cargada) lo registra en el
+    log y el resto se debe completar con `python cli.py backfill-schedules`.
+    Devuelve el número de filas generadas.
+    """
+    params = [since, until, limit + 1]
+    associate_filter = ""
+    if associate_id is not None:
+        params.append(associate_id)
+        associate_filter = "AND l.associate_id = $4"
+    loans = await conn.fetch(
+        f"""
+        SELECT l.id, l.amount, l.interest_rate, l.term_months, l.payment_frequency, l.created_at
+        FROM loans l
+        WHERE l.status = 'active' AND l.created_at::date <= $2
+          AND l.created_at >= $1::date - make_interval(months => CEIL(l.term_months)::int + 1)
+          {associate_filter}
+          AND NOT EXISTS (SELECT 1 FROM loan_schedule s WHERE s.loan_id = l.id)
+        ORDER BY l.id
+        LIMIT $3
+        """,
+        *params
+    )
+    if len(loans) > limit:
+        logger.warning(
+            f"Más de {limit} préstamos activos sin tabla de amortización; se generaron {limit}. "
+            "Ejecuta `python cli.py backfill-schedules` para completar el resto."
+        )
+    return await store_loan_schedules(conn, loans[:limit])
+
+def current_quincena(today: date) -> tuple:
+    """Primer y último día de la quincena que contiene `today`."""
+    if today.day <= 15:
+        return today.replace(day=1), today.replace(day=15)
+    next_month = date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    return today.replace(day=16), date.fromordinal(next_month.toordinal() - 1)
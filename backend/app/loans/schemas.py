@@ -43,6 +43,31 @@ class PaymentResponse(BaseModel):
     payment_date: date
     updated_at: datetime
 
+class BatchPaymentItem(PaymentCreate):
+    loan_id: int
+
+class BatchPaymentRequest(BaseModel):
+    payments: List[BatchPaymentItem] = Field(..., min_length=1, max_length=5000)
+
+class BatchPaymentResult(BaseModel):
+    index: int
+    loan_id: int
+    payment_id: Optional[int] = None
+    amount_paid: Optional[float] = None
+    payment_date: Optional[date] = None
+    error: Optional[str] = None
+
+class LoanBalanceResponse(BaseModel):
+    loan_id: int
+    payments_made: int
+    total_paid: float
+    outstanding_balance: float
+
+class BatchPaymentResponse(BaseModel):
+    created: int
+    results: List[BatchPaymentResult]
+    balances: List[LoanBalanceResponse]
+
 class LoanStatusUpdate(BaseModel):
     status: Literal['pending', 'active', 'paid', 'defaulted']
 
@@ -57,6 +82,16 @@ class AmortizationPayment(BaseModel):
 class AmortizationScheduleResponse(BaseModel):
     schedule: List[AmortizationPayment]
 
+class DueInstallmentResponse(BaseModel):
+    loan_id: int
+    payment_number: int
+    due_date: date
+    amount: float
+    user_id: int
+    associate_id: Optional[int] = None
+    user_first_name: str
+    user_last_name: str
+
 class GlobalLoanSummaryResponse(BaseModel):
     total_loans: int
     active_loans: int
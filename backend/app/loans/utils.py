@@ -1,57 +1,33 @@
 import logging
 from datetime import date
-from dateutil.relativedelta import relativedelta
+from types import MappingProxyType
+from typing import Mapping, Tuple
+
+from app.core.config import settings
+from app.common import metrics
+from app.common.cache import TTLCache
+from app.loans import amortization
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def calculate_amortization_schedule(amount: float, interest_rate: float, term_months: float, start_date: date, payment_frequency: str = 'quincenal'):
-    logger.info(f"Calculating schedule: amount={amount}, interest_rate={interest_rate}, term_months={term_months}, start_date={start_date}, freq={payment_frequency}")
-    
-    if payment_frequency == 'quincenal':
-        periods_per_year = 24
-        total_periods = term_months * 2
-    else:
-        periods_per_year = 12
-        total_periods = term_months
-
-    if interest_rate <= 0 or total_periods <= 0:
-        return []
-
-    num_payments = int(round(total_periods))
-    periodic_interest_rate = (interest_rate / 100) / periods_per_year
-    
-    try:
-        denominator = (1 - (1 + periodic_interest_rate) ** -total_periods)
-        periodic_payment = (amount * periodic_interest_rate) / denominator if denominator != 0 else amount / total_periods
-    except (ValueError, OverflowError):
-        return []
-
-    schedule = []
-    remaining_balance = amount
-    current_date = start_date
-
-    for i in range(1, num_payments + 1):
-        if payment_frequency == 'quincenal':
-            # Asumimos quincenas los días 15 y fin de mes (o último día)
-            if current_date.day < 15:
-                current_date = current_date.replace(day=15)
-            else:
-                # Siguiente mes, día 1
-                current_date = (current_date.replace(day=1) + relativedelta(months=1))
-        else: # Mensual
-            current_date += relativedelta(months=1)
+# Los términos de un préstamo no cambian una vez creado, así que su tabla de
+# amortización se puede memorizar sin expiración; el LRU acota la memoria.
+schedule_cache = TTLCache(maxsize=settings.AMORTIZATION_CACHE_MAX_SIZE)
+metrics.register_stats_gauges("credinet_amortization_cache", "Caché de tablas de amortización de este worker.", schedule_cache.stats)
 
-        interest_payment = remaining_balance * periodic_interest_rate
-        principal_payment = periodic_payment - interest_payment
-        remaining_balance -= principal_payment
-        
-        schedule.append({
-            "payment_number": i,
-            "payment_date": current_date,
-            "payment_amount": round(periodic_payment, 2),
-            "principal": round(principal_payment, 2),
-            "interest": round(interest_payment, 2),
-            "balance": round(remaining_balance, 2) if remaining_balance > 0 else 0,
-        })
+def calculate_amortization_schedule(amount: float, interest_rate: float, term_months: float, start_date: date, payment_frequency: str = 'quincenal') -> Tuple[Mapping, ...]:
+    """
+    Devuelve la tabla de amortización como tupla de filas de sólo lectura,
+    compartida entre llamadas con los mismos términos.
+    """
+    key = (float(amount), float(interest_rate), float(term_months), start_date, payment_frequency)
+    schedule = schedule_cache.get(key)
+    if schedule is None:
+        logger.debug(f"Calculating schedule: amount={amount}, interest_rate={interest_rate}, term_months={term_months}, start_date={start_date}, freq={payment_frequency}")
+        schedule = tuple(
+            MappingProxyType(row)
+            for row in amortization.build_schedule(amount, interest_rate, term_months, start_date, payment_frequency)
+        )
+        schedule_cache.set(key, schedule)
     return schedule
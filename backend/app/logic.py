@@ -1,51 +1,161 @@
 import asyncpg
-from app.loans import utils
+from app.loans import amortization
 import logging
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 
 logger = logging.getLogger(__name__)
 
-async def get_enriched_loan(conn: asyncpg.Connection, loan_id: int):
-    try:
-        fetch_query = """
-        SELECT
-            l.*,
-            u.first_name as user_first_name,
-            u.last_name as user_last_name,
-            COALESCE(p.payments_made, 0) as payments_made,
-            COALESCE(p.total_paid, 0.0) as total_paid
-        FROM
-            loans l
-        JOIN users u ON l.user_id = u.id
-        LEFT JOIN (
-            SELECT loan_id, COUNT(id)::int as payments_made, SUM(amount_paid) as total_paid
-            FROM payments GROUP BY loan_id
-        ) p ON l.id = p.loan_id
-        WHERE l.id = $1
-        """
-        record = await conn.fetchrow(fetch_query, loan_id)
-
-        if not record:
-            return None
-
-        loan_dict = dict(record)
-        
-        amount = float(loan_dict['amount'])
-        interest_rate = float(loan_dict['interest_rate'])
-        term_months = float(loan_dict['term_months'])
-        payment_frequency = loan_dict['payment_frequency']
-        total_paid = float(loan_dict['total_paid'])
-
-        schedule = utils.calculate_amortization_schedule(amount, interest_rate, term_months, record['created_at'].date(), payment_frequency)
-        
-        if not schedule:
-            outstanding_balance = amount - total_paid
-        else:
-            total_to_be_paid = schedule[0]['payment_amount'] * len(schedule)
-            outstanding_balance = round(total_to_be_paid - total_paid, 2)
+ENRICHED_LOANS_SELECT = """
+SELECT
+    l.*,
+    u.first_name as user_first_name,
+    u.last_name as user_last_name,
+    COALESCE(b.payments_made, 0) as payments_made,
+    COALESCE(b.total_paid, 0.0) as total_paid,
+    b.last_payment_date,
+    s.scheduled_total_due
+FROM
+    loans l
+JOIN users u ON l.user_id = u.id
+LEFT JOIN loan_balances b ON l.id = b.loan_id
+LEFT JOIN LATERAL (
+    SELECT SUM(amount) AS scheduled_total_due FROM loan_schedule WHERE loan_id = l.id
+) s ON TRUE
+"""
+
+ENRICHED_LOANS_QUERY = ENRICHED_LOANS_SELECT + "WHERE l.id = ANY($1::int[])"
+
+def compute_outstanding_balances(loans: List[dict]) -> List[float]:
+    """
+    Saldo pendiente de cada préstamo: total a pagar según su amortización
+    menos lo pagado. Usa la tabla materializada (`scheduled_total_due`) cuando
+    existe y calcula las demás en una sola llamada vectorizada.
+    """
+    if not loans:
+        return []
+    pending = [loan for loan in loans if loan.get('scheduled_total_due') is None]
+    computed_totals = iter(amortization.batch_payment_totals(
+        [float(loan['amount']) for loan in pending],
+        [float(loan['interest_rate']) for loan in pending],
+        [float(loan['term_months']) for loan in pending],
+        [loan['payment_frequency'] for loan in pending],
+    ).total_due if pending else [])
 
+    balances = []
+    for loan in loans:
+        total_due = loan.get('scheduled_total_due')
+        total_due = next(computed_totals) if total_due is None else total_due
+        balances.append(round(float(total_due) - float(loan['total_paid']), 2))
+    return balances
+
+async def get_enriched_loans(conn: asyncpg.Connection, loan_ids: Iterable[int]) -> List[dict]:
+    """
+    Enriquece un conjunto de préstamos con una sola consulta (nombre del
+    prestatario, pagos realizados, total pagado) y calcula el saldo pendiente
+    en una sola pasada. Devuelve los préstamos en el mismo orden que `loan_ids`,
+    omitiendo los que no existen.
+    """
+    ids = list(dict.fromkeys(loan_ids))
+    if not ids:
+        return []
+
+    records = await conn.fetch(ENRICHED_LOANS_QUERY, ids)
+
+    loan_dicts = [dict(record) for record in records]
+    enriched: Dict[int, dict] = {}
+    for loan_dict, outstanding_balance in zip(loan_dicts, compute_outstanding_balances(loan_dicts)):
         loan_dict['outstanding_balance'] = outstanding_balance
-        
-        return loan_dict
+        enriched[loan_dict['id']] = loan_dict
+
+    return [enriched[loan_id] for loan_id in ids if loan_id in enriched]
+
+async def iter_enriched_loans(conn: asyncpg.Connection, where_clause: str = "", params: Iterable = (), chunk_size: int = 500) -> AsyncIterator[List[dict]]:
+    """
+    Recorre con un cursor del servidor todos los préstamos que cumplen
+    `where_clause` (ordenados por id) y los entrega enriquecidos en bloques de
+    `chunk_size`, de modo que la memoria no depende del tamaño de la cartera.
+    Todo el recorrido ve una misma instantánea de la BD.
+    """
+    query = f"{ENRICHED_LOANS_SELECT} {where_clause} ORDER BY l.id"
+    async with conn.transaction(isolation='repeatable_read', readonly=True):
+        cursor = await conn.cursor(query, *params)
+        while True:
+            loan_dicts = [dict(record) for record in await cursor.fetch(chunk_size)]
+            if not loan_dicts:
+                return
+            for loan_dict, outstanding_balance in zip(loan_dicts, compute_outstanding_balances(loan_dicts)):
+                loan_dict['outstanding_balance'] = outstanding_balance
+            yield loan_dicts
+
+async def get_enriched_loan(conn: asyncpg.Connection, loan_id: int):
+    try:
+        loans = await get_enriched_loans(conn, [loan_id])
+        return loans[0] if loans else None
     except Exception as e:
         logger.error(f"CRITICAL ERROR in get_enriched_loan for loan_id={loan_id}: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+# Total a pagar de un préstamo `l` calculado en SQL con la misma fórmula de
+# anualidad que `amortization.batch_payment_totals` (pago redondeado a centavos
+# por número de pagos; el monto si el préstamo no genera cronograma).
+LOAN_TOTAL_DUE_SQL = """
+    CASE
+        WHEN l.interest_rate > 0 AND t.periods > 0 AND ROUND(t.periods) > 0 THEN
+            ROUND((l.amount * t.rate / (1 - POWER(1 + t.rate, -t.periods)))::numeric, 2) * ROUND(t.periods)::int
+        ELSE l.amount
+    END
+"""
+
+LOAN_TERMS_LATERAL_SQL = """
+    CROSS JOIN LATERAL (
+        SELECT
+            (CASE WHEN l.payment_frequency = 'quincenal' THEN l.term_months * 2 ELSE l.term_months END)::float8 AS periods,
+            (l.interest_rate / 100.0 / CASE WHEN l.payment_frequency = 'quincenal' THEN 24 ELSE 12 END)::float8 AS rate
+    ) t
+"""
+
+async def get_loan_summary(conn: asyncpg.Connection, associate_id: Optional[int] = None) -> dict:
+    """
+    Resumen de cartera (conteos, monto prestado, saldo pendiente y comisión)
+    calculado por completo en una sola consulta agregada.
+    """
+    params = []
+    where_clause = ""
+    if associate_id is not None:
+        params.append(associate_id)
+        where_clause = f"WHERE l.associate_id = ${len(params)}"
+
+    query = f"""
+    SELECT
+        COUNT(l.id)::int AS total_loans,
+        COUNT(l.id) FILTER (WHERE l.status = 'active')::int AS active_loans,
+        COALESCE(SUM(l.amount), 0)::float8 AS total_loaned_amount,
+        COALESCE(SUM(ROUND({LOAN_TOTAL_DUE_SQL} - COALESCE(b.total_paid, 0), 2)), 0)::float8 AS total_outstanding_balance,
+        COALESCE(SUM(l.amount * COALESCE(l.commission_rate, 0) / 100.0), 0)::float8 AS total_commission
+    FROM loans l
+    {LOAN_TERMS_LATERAL_SQL}
+    LEFT JOIN loan_balances b ON l.id = b.loan_id
+    {where_clause}
+    """
+    return dict(await conn.fetchrow(query, *params))
+
+async def get_associate_portfolio_summary(conn: asyncpg.Connection, associate_id: int) -> dict:
+    """
+    Resumen de cartera de un asociado leído de `associate_portfolio_stats`
+    (una fila mantenida por triggers). Un asociado sin préstamos devuelve ceros.
+    """
+    record = await conn.fetchrow(
+        """
+        SELECT
+            total_loans, active_loans,
+            total_loaned_amount::float8 AS total_loaned_amount,
+            (total_due - total_paid)::float8 AS total_outstanding_balance,
+            total_commission::float8 AS total_commission
+        FROM associate_portfolio_stats
+        WHERE associate_id = $1
+        """,
+        associate_id
+    )
+    if record is None:
+        return {"total_loans": 0, "active_loans": 0, "total_loaned_amount": 0.0, "total_outstanding_balance": 0.0, "total_commission": 0.0}
+    return dict(record)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core import config
 from app.auth import routes as auth_routes
@@ -6,7 +6,13 @@ from app.loans import routes as loans_routes
 from app.associates import routes as associates_routes
 from app.beneficiaries import routes as beneficiaries_routes
 from app.utils import routes as utils_routes
-from app.common.database import create_db_pool, close_db_pool
+from app.common.database import create_db_pool, close_db_pool, get_db_context
+from app.common.notifications import change_listener
+from app.auth.hashing import password_hasher
+from app.utils.availability import availability_filter
+from app.utils.zip_codes import zip_code_service
+from app.common import metrics
+from app.common.metrics import MetricsMiddleware
 
 app = FastAPI(
     title="Credinet API",
@@ -17,10 +23,18 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     await create_db_pool()
+    zip_code_service.start()
+    await change_listener.start()
+    if config.settings.AVAILABILITY_FILTER_ENABLED:
+        async with get_db_context() as conn:
+            await availability_filter.warm(conn)
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await change_listener.close()
     await close_db_pool()
+    password_hasher.shutdown()
+    await zip_code_service.close()
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +43,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Endpoints base
 app.include_router(auth_routes.router, prefix="/api/auth", tags=["Auth & Users"])
@@ -40,3 +55,7 @@ app.include_router(utils_routes.router, prefix="/api/utils", tags=["Utilities"])
 @app.get("/api/ping")
 def ping():
     return {"message": "pong"}
+
+@app.get("/api/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
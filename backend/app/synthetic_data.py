@@ -0,0 +1,270 @@
+"""
+Generador de datos sintéticos para pruebas de capacidad (`python cli.py generate-data`).
+
+Crea asociados (cada uno con su usuario `asociado`), clientes repartidos entre
+ellos con una cartera desigual, préstamos quincenales y mensuales con tasas y
+plazos habituales, su tabla de amortización y un historial de pagos coherente
+con ella: cada cuota vencida a la fecha de corte se paga unos días antes o
+después de su vencimiento, salvo en los préstamos que caen en mora, que dejan
+de pagar a partir de alguna cuota. El estado del préstamo (`pending`,
+`active`, `paid`, `defaulted`) se deriva de ese historial.
+
+Todo se carga con COPY en una sola transacción. Mientras tanto se desactivan
+los triggers de `loans`, `payments` y `loan_balances` (un UPDATE del libro
+mayor por cada pago haría la carga mucho más lenta) y al final se reconstruyen
+`loan_balances` y `associate_portfolio_stats` con `ledger`. ALTER TABLE
+bloquea esas tablas hasta el COMMIT, así que la carga se debe correr con la
+API detenida o sin tráfico.
+
+Con la misma semilla y fecha de corte sobre una BD recién creada se obtienen
+los mismos datos. Los campos únicos (username, email, teléfono, CURP) se
+derivan del id, así que no chocan entre corridas.
+"""
+import itertools
+import math
+import random
+import unicodedata
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from faker import Faker
+
+from app.auth.bulk_import import USER_COLUMNS
+from app.loans import amortization, ledger
+
+ASSOCIATE_COLUMNS = ('id', 'name', 'level_id', 'contact_person', 'contact_email', 'default_commission_rate')
+LOAN_COLUMNS = ('id', 'user_id', 'associate_id', 'amount', 'interest_rate', 'commission_rate', 'term_months', 'payment_frequency', 'status', 'created_at')
+SCHEDULE_COLUMNS = ('loan_id', 'payment_number', 'due_date', 'amount', 'principal', 'interest', 'balance')
+PAYMENT_COLUMNS = ('loan_id', 'amount_paid', 'payment_date')
+BENEFICIARY_COLUMNS = ('user_id', 'full_name', 'relationship', 'phone_number')
+TRIGGER_TABLES = ('loans', 'payments', 'loan_balances')
+ANALYZE_TABLES = ('associates', 'users', 'user_roles', 'beneficiaries', 'loans', 'loan_schedule', 'payments', 'loan_balances', 'associate_portfolio_stats')
+
+# Plazos en meses por frecuencia y tasas anuales (%) habituales en la cartera.
+TERMS = {'quincenal': (3, 6, 9, 12), 'mensual': (6, 12, 18, 24)}
+INTEREST_RATES = (12.0, 15.0, 18.0, 20.0, 24.0, 30.0, 36.0)
+COMMISSION_RATES = (4.0, 5.0, 5.5, 6.0, 7.0)
+MIN_AMOUNT, MAX_AMOUNT = 1000, 60000
+QUINCENAL_SHARE = 0.7
+DEFAULT_SHARE = 0.08       # préstamos que dejan de pagar en alguna cuota
+PENDING_SHARE = 0.5        # de los que aún no tienen cuotas vencidas, los que siguen sin aprobarse
+GRACE_DAYS = 30            # atraso de la primera cuota impagada a partir del cual hay mora
+BENEFICIARY_SHARE = 0.6
+RELATIONSHIPS = ('Esposo(a)', 'Hijo(a)', 'Padre', 'Madre', 'Hermano(a)')
+CURP_STATES = 'AS BC BS CC CL CM CS CH DF DG GT GR HG JC MC MN MS NT NL OC PL QT QR SP SL SR TC TS TL VZ YN ZS'.split()
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _slug(text: str) -> str:
+    ascii_text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return ''.join(char for char in ascii_text.lower() if char.isalnum())
+
+
+def _base36(number: int, width: int) -> str:
+    digits = ''
+    for _ in range(width):
+        number, remainder = divmod(number, 36)
+        digits = BASE36[remainder] + digits
+    return digits
+
+
+def _decimal(value: float) -> Decimal:
+    return Decimal(str(value))
+
+
+def build_associate(fake: Faker, rng: random.Random, associate_id: int, level_ids: Sequence[int]) -> tuple:
+    company = fake.company()
+    return (
+        associate_id, f"{company} {associate_id}"[:150], rng.choice(level_ids), fake.name()[:150],
+        f"contacto{associate_id}@{_slug(company)[:30] or 'asociado'}.mx", _decimal(rng.choice(COMMISSION_RATES)),
+    )
+
+
+def build_user(fake: Faker, rng: random.Random, user_id: int, associate_id: Optional[int], password_hash: str, as_of: date) -> dict:
+    """Usuario con datos de Faker; los campos únicos llevan el id para no repetirse."""
+    first_name, last_name = fake.first_name(), fake.last_name()
+    birth_date = as_of - timedelta(days=rng.randint(20 * 365, 70 * 365))
+    username = f"{_slug(first_name)[:20]}.{_slug(last_name)[:20]}{user_id}"
+    curp = (
+        (_slug(last_name)[:2] + _slug(first_name)[:2]).upper().ljust(4, 'X')
+        + birth_date.strftime('%y%m%d') + rng.choice('HM') + rng.choice(CURP_STATES) + _base36(user_id, 5)
+    )
+    return {
+        'id': user_id,
+        'username': username,
+        'password_hash': password_hash,
+        'first_name': first_name[:100],
+        'last_name': last_name[:100],
+        'email': f"{username}@{fake.free_email_domain()}",
+        'phone_number': f"9{user_id:09d}",
+        'birth_date': birth_date,
+        'curp': curp,
+        'profile_picture_url': None,
+        'address_street': fake.street_name()[:255],
+        'address_ext_num': fake.building_number()[:20],
+        'address_int_num': str(rng.randint(1, 20)) if rng.random() < 0.2 else None,
+        'address_colonia': fake.city()[:100],
+        'address_zip_code': f"{rng.randint(1000, 99999):05d}",
+        'address_state': fake.state()[:50],
+        'associate_id': associate_id,
+    }
+
+
+def build_loan(rng: random.Random, loan_id: int, user_id: int, associate_id: int, commission_rate: Decimal,
+               max_amount: Optional[Decimal], as_of: date, months_back: int) -> Tuple[tuple, List[tuple], List[tuple]]:
+    """
+    Préstamo, su tabla de amortización y sus pagos hasta `as_of`. Devuelve
+    tuplas en el orden de LOAN_COLUMNS, SCHEDULE_COLUMNS y PAYMENT_COLUMNS.
+    """
+    frequency = 'quincenal' if rng.random() < QUINCENAL_SHARE else 'mensual'
+    term_months = rng.choice(TERMS[frequency])
+    interest_rate = rng.choice(INTEREST_RATES)
+    # Log-uniforme: abundan los montos chicos, como en la cartera real.
+    amount = round(math.exp(rng.uniform(math.log(MIN_AMOUNT), math.log(MAX_AMOUNT))) / 500) * 500
+    if max_amount is not None:
+        amount = min(amount, int(max_amount))
+    start = as_of - timedelta(days=rng.randint(0, months_back * 30))
+    created_at = datetime.combine(start, time(rng.randint(9, 18), rng.randint(0, 59)), tzinfo=timezone.utc)
+
+    schedule = amortization.build_schedule(amount, interest_rate, term_months, start, frequency)
+    stop = rng.randint(0, len(schedule) - 1) if rng.random() < DEFAULT_SHARE else len(schedule)
+    payments = []
+    for row in schedule[:stop]:
+        if row['payment_date'] > as_of:
+            break
+        paid_on = row['payment_date'] + timedelta(days=rng.randint(-3, 5))
+        payments.append((loan_id, _decimal(row['payment_amount']), min(as_of, max(start, paid_on))))
+
+    overdue = [row['payment_date'] for row in schedule[len(payments):] if row['payment_date'] <= as_of]
+    if len(payments) == len(schedule):
+        status = 'paid'
+    elif overdue and (as_of - overdue[0]).days > GRACE_DAYS:
+        status = 'defaulted'
+    elif not payments and not overdue and rng.random() < PENDING_SHARE:
+        status = 'pending'
+    else:
+        status = 'active'
+
+    loan = (
+        loan_id, user_id, associate_id, _decimal(amount), _decimal(interest_rate), commission_rate,
+        _decimal(term_months), frequency, status, created_at,
+    )
+    schedule_rows = [
+        (loan_id, row['payment_number'], row['payment_date'],
+         *(_decimal(row[key]) for key in ('payment_amount', 'principal', 'interest', 'balance')))
+        for row in schedule
+    ]
+    return loan, schedule_rows, payments
+
+
+async def _reserve_ids(conn: asyncpg.Connection, table: str, count: int) -> List[int]:
+    records = await conn.fetch(
+        f"SELECT nextval(pg_get_serial_sequence('{table}', 'id')) AS id FROM generate_series(1, $1)", count
+    )
+    return [record['id'] for record in records]
+
+
+def _chunks(total: int, size: int):
+    for start in range(0, total, size):
+        yield min(size, total - start)
+
+
+async def _load_users(conn: asyncpg.Connection, fake: Faker, rng: random.Random, role_id: int,
+                      associate_ids: Sequence[int], password_hash: str, as_of: date, with_beneficiaries: bool) -> List[int]:
+    user_ids = await _reserve_ids(conn, 'users', len(associate_ids))
+    users = [
+        build_user(fake, rng, user_id, associate_id, password_hash, as_of)
+        for user_id, associate_id in zip(user_ids, associate_ids)
+    ]
+    await conn.copy_records_to_table(
+        'users', columns=('id', *USER_COLUMNS), records=[tuple(user[column] for column in ('id', *USER_COLUMNS)) for user in users]
+    )
+    await conn.copy_records_to_table('user_roles', columns=('user_id', 'role_id'), records=[(user_id, role_id) for user_id in user_ids])
+    if with_beneficiaries:
+        beneficiaries = [
+            (user_id, fake.name()[:255], rng.choice(RELATIONSHIPS), f"{rng.randint(10 ** 9, 10 ** 10 - 1)}")
+            for user_id in user_ids if rng.random() < BENEFICIARY_SHARE
+        ]
+        await conn.copy_records_to_table('beneficiaries', columns=BENEFICIARY_COLUMNS, records=beneficiaries)
+    return user_ids
+
+
+async def generate_dataset(conn: asyncpg.Connection, *, associates: int, clients: int, loans: int, seed: int,
+                           password_hash: str, as_of: date, months_back: int = 24, chunk_size: int = 10000,
+                           progress: Optional[Callable[[str], None]] = None) -> Dict[str, int]:
+    """
+    Genera y carga el conjunto de datos. Todos los usuarios comparten
+    `password_hash`. Devuelve cuántas filas se escribieron por tabla.
+    """
+    if clients and not associates:
+        raise ValueError("Se necesita al menos un asociado para repartir a los clientes.")
+    if loans and not clients:
+        raise ValueError("Se necesita al menos un cliente para generar préstamos.")
+
+    report = progress or (lambda message: None)
+    rng = random.Random(seed)
+    fake = Faker('es_MX')
+    fake.seed_instance(seed)
+    counts = dict.fromkeys(('associates', 'users', 'loans', 'loan_schedule', 'payments'), 0)
+
+    role_ids = {record['name']: record['id'] for record in await conn.fetch("SELECT id, name FROM roles")}
+    max_amounts = {record['id']: record['max_loan_amount'] for record in await conn.fetch("SELECT id, max_loan_amount FROM associate_levels ORDER BY id")}
+    if not max_amounts or not {'asociado', 'cliente'} <= role_ids.keys():
+        raise ValueError("Faltan los roles o niveles de asociado del seed inicial.")
+
+    async with conn.transaction():
+        for table in TRIGGER_TABLES:
+            await conn.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+
+        associate_rows = [
+            build_associate(fake, rng, associate_id, list(max_amounts))
+            for associate_id in await _reserve_ids(conn, 'associates', associates)
+        ]
+        await conn.copy_records_to_table('associates', columns=ASSOCIATE_COLUMNS, records=associate_rows)
+        await _load_users(conn, fake, rng, role_ids['asociado'], [row[0] for row in associate_rows], password_hash, as_of, False)
+        counts['associates'] = counts['users'] = len(associate_rows)
+        report(f"{len(associate_rows)} asociados con su usuario.")
+
+        # Pocos asociados concentran la mayor parte de la cartera.
+        cum_weights = list(itertools.accumulate(rng.paretovariate(1.2) for _ in associate_rows))
+        client_rows = []  # (user_id, índice del asociado)
+        for size in _chunks(clients, chunk_size):
+            picks = rng.choices(range(len(associate_rows)), cum_weights=cum_weights, k=size)
+            user_ids = await _load_users(
+                conn, fake, rng, role_ids['cliente'], [associate_rows[i][0] for i in picks], password_hash, as_of, True
+            )
+            client_rows.extend(zip(user_ids, picks))
+            counts['users'] += size
+            report(f"{len(client_rows)}/{clients} clientes.")
+
+        for size in _chunks(loans, chunk_size):
+            loan_rows, schedule_rows, payment_rows = [], [], []
+            for loan_id in await _reserve_ids(conn, 'loans', size):
+                user_id, index = rng.choice(client_rows)
+                associate_id, _, level_id, _, _, commission_rate = associate_rows[index]
+                loan, schedule, payments = build_loan(
+                    rng, loan_id, user_id, associate_id, commission_rate, max_amounts[level_id], as_of, months_back
+                )
+                loan_rows.append(loan)
+                schedule_rows.extend(schedule)
+                payment_rows.extend(payments)
+            await conn.copy_records_to_table('loans', columns=LOAN_COLUMNS, records=loan_rows)
+            await conn.copy_records_to_table('loan_schedule', columns=SCHEDULE_COLUMNS, records=schedule_rows)
+            await conn.copy_records_to_table('payments', columns=PAYMENT_COLUMNS, records=payment_rows)
+            counts['loans'] += len(loan_rows)
+            counts['loan_schedule'] += len(schedule_rows)
+            counts['payments'] += len(payment_rows)
+            report(f"{counts['loans']}/{loans} préstamos, {counts['payments']} pagos.")
+
+        # Con los triggers aún desactivados, para no actualizar el resumen por asociado fila por fila.
+        await ledger.rebuild_loan_balances(conn)
+        await ledger.rebuild_associate_stats(conn)
+        for table in TRIGGER_TABLES:
+            await conn.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+
+    report("Actualizando estadísticas del planificador (ANALYZE).")
+    for table in ANALYZE_TABLES:
+        await conn.execute(f"ANALYZE {table}")
+    return counts
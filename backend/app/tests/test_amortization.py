@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+
+from app.loans import amortization
+
+
+def test_build_schedule_matches_annuity_totals():
+    schedule = amortization.build_schedule(5000.0, 15.5, 12, date(2025, 1, 10), 'quincenal')
+
+    assert len(schedule) == 24
+    assert schedule[0]['payment_date'] == date(2025, 1, 15)
+    assert schedule[1]['payment_date'] == date(2025, 2, 1)
+    assert schedule[-1]['balance'] == 0
+    assert sum(row['principal'] for row in schedule) == pytest.approx(5000.0, abs=0.05)
+
+
+def test_monthly_dates_clip_to_short_months():
+    dates = amortization.payment_dates(date(2025, 1, 31), 3, 'mensual')
+
+    assert dates == [date(2025, 2, 28), date(2025, 3, 28), date(2025, 4, 28)]
+
+
+def test_batch_payment_totals_agrees_with_full_schedule():
+    loans = [
+        (5000.0, 15.5, 12, 'quincenal'),
+        (10000.0, 12.0, 24, 'mensual'),
+        (2500.0, 0.0, 6, 'quincenal'),
+    ]
+    totals = amortization.batch_payment_totals(*zip(*loans))
+
+    for (amount, rate, term, freq), total_due, num_payments in zip(loans, totals.total_due, totals.num_payments):
+        schedule = amortization.build_schedule(amount, rate, term, date(2025, 1, 1), freq)
+        expected = schedule[0]['payment_amount'] * len(schedule) if schedule else amount
+        assert num_payments == len(schedule)
+        assert total_due == pytest.approx(expected)
+
+
+def test_calculate_amortization_schedule_is_memoized_and_read_only():
+    from app.loans.utils import calculate_amortization_schedule, schedule_cache
+
+    hits_before = schedule_cache.hits
+    first = calculate_amortization_schedule(7500.0, 18.0, 18, date(2025, 3, 1), 'quincenal')
+    second = calculate_amortization_schedule(7500.0, 18.0, 18, date(2025, 3, 1), 'quincenal')
+
+    assert first is second
+    assert schedule_cache.hits == hits_before + 1
+    with pytest.raises(TypeError):
+        first[0]['balance'] = 0
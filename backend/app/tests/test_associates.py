@@ -0,0 +1,24 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.auth.jwt import get_current_user
+from app.auth.schemas import UserInDB
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: UserInDB(
+        id=3, username="asociado_test", first_name="Asociado", last_name="Prueba", phone_number="5533445566",
+        roles=["asociado"], password_hash="x", associate_id=1, updated_at=datetime(2025, 1, 1),
+    )
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("limit", [0, -1, 101])
+def test_dashboard_rejects_out_of_range_limit(client, limit):
+    response = client.get("/api/associates/dashboard", params={"limit": limit})
+    assert response.status_code == 422
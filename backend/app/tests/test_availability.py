@@ -0,0 +1,57 @@
+import contextlib
+
+import pytest
+
+from app.common.bloom import BloomFilter
+from app.utils import availability
+
+
+class FakeConnection:
+    def __init__(self, users):
+        self.users = users
+
+    async def fetchval(self, query):
+        return len(self.users)
+
+    def transaction(self, **kwargs):
+        return _transaction()
+
+    async def cursor(self, query, prefetch):
+        for user in self.users:
+            yield user
+
+
+@contextlib.asynccontextmanager
+async def _transaction():
+    yield
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    for i in range(2000):
+        bloom.add(f"usuario{i}")
+
+    assert all(f"usuario{i}" in bloom for i in range(2000))
+    false_positives = sum(f"otro{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_check_availability_answers_free_values_without_the_database(monkeypatch):
+    availability_filter = availability.AvailabilityFilter()
+    monkeypatch.setattr(availability, "availability_filter", availability_filter)
+    await availability_filter.warm(FakeConnection([
+        {"username": "jperez", "email": None, "phone_number": "5512345678", "curp": None},
+    ]))
+    availability_filter.add([{"username": "nuevo", "email": "nuevo@example.com", "phone_number": "5500000000", "curp": None}])
+
+    def no_database():
+        raise AssertionError("no debería consultar la BD")
+    monkeypatch.setattr(availability.database, "get_db_context", no_database)
+
+    result = await availability.check_availability({"username": "libre", "phone_number": "5599999999"})
+
+    assert result == {"username": False, "phone_number": False}
+    assert not availability_filter.is_free("username", "jperez")
+    assert not availability_filter.is_free("email", "nuevo@example.com")
+    assert availability_filter.stats()["filter_answers"] == 2
@@ -0,0 +1,81 @@
+import contextlib
+
+import pytest
+
+from app.auth import bulk_import
+
+pytestmark = pytest.mark.asyncio
+
+HASH = "$2b$04$QOA7urBNdeVnuYpvF9EUh.t7WFn7r6ELx9z99iyJhLd.Zlq/0ITfK"
+
+CSV = f"""username,password_hash,first_name,last_name,phone_number,email,roles,beneficiary_full_name,beneficiary_relationship,beneficiary_phone_number
+ana,{HASH},Ana,López,55-1234-5678,ana@example.com,cliente,Luis López,Hermano,5511112222
+beto,{HASH},Beto,Ruiz,5598765432,,cliente|auxiliar_administrativo,,,
+ana,{HASH},Ana,Otra,5500000000,,cliente,,,
+carla,{HASH},Carla,Díaz,123,,cliente,,,
+dani,{HASH},Dani,Soto,5522223333,,gerente,,,
+eva,{HASH},Eva,Mora,5544445555,,cliente,,,
+"""
+
+
+class FakeConnection:
+    """Conexión mínima: roles fijos, un usuario existente y registro de los COPY."""
+
+    def __init__(self):
+        self.copied = {}
+
+    async def fetch(self, query, *args):
+        if "FROM roles" in query:
+            return [{"id": 3, "name": "auxiliar_administrativo"}, {"id": 5, "name": "cliente"}]
+        if "FROM users" in query:
+            return [{"username": "eva", "email": None, "phone_number": "5544445555", "curp": None}]
+        if "INSERT INTO users" in query:
+            return [{"id": 100 + i, "username": row[1]} for i, row in enumerate(self.copied["import_users"])]
+        raise AssertionError(query)
+
+    async def execute(self, query, *args):
+        return "OK"
+
+    async def copy_records_to_table(self, table, columns, records):
+        self.copied[table] = list(records)
+
+    def transaction(self):
+        @contextlib.asynccontextmanager
+        async def transaction():
+            yield
+        return transaction()
+
+
+async def test_import_users_reports_row_errors_and_loads_the_rest():
+    conn = FakeConnection()
+    rows = bulk_import.parse_rows(CSV, "csv")
+
+    result = await bulk_import.import_users(conn, rows)
+
+    assert result.received == 6
+    assert result.created == 2
+    assert [(error.row, error.field) for error in result.errors] == [
+        (3, "username"), (4, "phone_number"), (5, "roles"), (6, "username"),
+    ]
+    assert [record[1] for record in conn.copied["import_users"]] == ["ana", "beto"]
+    assert conn.copied["import_users"][0][6] == "5512345678"
+    assert conn.copied["import_users"][0][2] == HASH
+    assert sorted(conn.copied["user_roles"]) == [(100, 5), (101, 3), (101, 5)]
+    assert conn.copied["beneficiaries"] == [(100, "Luis López", "Hermano", "5511112222")]
+
+
+async def test_malformed_ndjson_line_is_reported_and_other_rows_import():
+    conn = FakeConnection()
+    content = "\n".join([
+        f'{{"username": "ana", "password_hash": "{HASH}", "first_name": "Ana", "last_name": "López", "phone_number": "5512345678"}}',
+        '{"username": "roto", "first_name": ',
+        f'{{"username": "beto", "password_hash": "{HASH}", "first_name": "Beto", "last_name": "Ruiz", "phone_number": "5598765432"}}',
+    ])
+
+    result = await bulk_import.import_users(conn, bulk_import.parse_rows(content, "ndjson"))
+
+    assert result.received == 3
+    assert result.created == 2
+    assert [error.row for error in result.errors] == [2]
+    assert result.errors[0].message.startswith("JSON inválido")
+    assert [record[1] for record in conn.copied["import_users"]] == ["ana", "beto"]
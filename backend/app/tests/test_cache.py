@@ -0,0 +1,34 @@
+import time
+
+from app.common.cache import TTLCache
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 2)
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate_where():
+    cache = TTLCache(maxsize=10)
+    cache.set("ana", {"id": 1})
+    cache.set("luis", {"id": 2})
+
+    assert cache.invalidate_where(lambda _, user: user["id"] == 2) == 1
+    assert "luis" not in cache and "ana" in cache
@@ -0,0 +1,56 @@
+import contextlib
+import json
+
+import pytest
+
+from app.loans import client_dashboard
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = 0
+
+    async def fetchrow(self, query, user_id):
+        self.queries += 1
+        return {
+            "loans": json.dumps([
+                {"id": 1, "amount": 5000.0, "status": "active", "outstanding_balance": 1200.5},
+                {"id": 2, "amount": 3000.0, "status": "paid", "outstanding_balance": 0},
+            ]),
+            "recent_payments": json.dumps([{"id": 9, "loan_id": 1, "amount_paid": 450.0, "payment_date": "2025-02-15"}]),
+        }
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    fake = FakeConnection()
+
+    @contextlib.asynccontextmanager
+    async def get_db_context():
+        yield fake
+
+    monkeypatch.setattr(client_dashboard.database, "get_db_context", get_db_context)
+    monkeypatch.setattr(type(client_dashboard.change_listener), "connected", property(lambda self: True))
+    client_dashboard.dashboard_cache.clear()
+    return fake
+
+
+async def test_dashboard_is_cached_until_the_user_is_notified(conn):
+    first = await client_dashboard.get_client_dashboard_json(7)
+    second = await client_dashboard.get_client_dashboard_json(7)
+
+    assert first is second
+    assert conn.queries == 1
+    body = json.loads(first)
+    assert body["summary"] == {"active_loans_count": 1, "total_outstanding_balance": 1200.5}
+    assert body["recent_payments"][0]["payment_date"] == "2025-02-15"
+
+    client_dashboard._on_notify("8")
+    await client_dashboard.get_client_dashboard_json(7)
+    assert conn.queries == 1
+
+    client_dashboard._on_notify("7")
+    await client_dashboard.get_client_dashboard_json(7)
+    assert conn.queries == 2
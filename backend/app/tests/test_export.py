@@ -0,0 +1,34 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.loans.export import EXPORT_COLUMNS, export_lines
+
+pytestmark = pytest.mark.asyncio
+
+
+async def chunks():
+    yield [{"id": 1, "amount": Decimal("5000.00"), "user_first_name": "José", "last_payment_date": date(2025, 2, 15)}]
+    yield [{"id": 2, "amount": Decimal("1200.50"), "user_first_name": "Ana, María", "last_payment_date": None}]
+
+
+async def test_export_lines_csv_has_header_and_one_row_per_loan():
+    text = "".join([line async for line in export_lines(chunks(), "csv")])
+    rows = list(csv.DictReader(io.StringIO(text)))
+
+    assert list(rows[0]) == list(EXPORT_COLUMNS)
+    assert [(row["id"], row["user_first_name"], row["last_payment_date"]) for row in rows] == [
+        ("1", "José", "2025-02-15"), ("2", "Ana, María", ""),
+    ]
+
+
+async def test_export_lines_ndjson_serializes_decimals_and_dates():
+    lines = [json.loads(line) for chunk in [line async for line in export_lines(chunks(), "ndjson")] for line in chunk.splitlines()]
+
+    assert [(line["id"], line["amount"], line["last_payment_date"]) for line in lines] == [
+        (1, 5000.0, "2025-02-15"), (2, 1200.5, None),
+    ]
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import hashing
+from app.auth.hashing import PasswordHasher
+
+
+def test_password_hasher_rejects_when_saturated():
+    hasher = PasswordHasher(max_workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(hasher._run("hash", release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert hasher.stats()["queued"] == 1
+        with pytest.raises(HTTPException) as excinfo:
+            await hasher._run("hash", release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+    hasher.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert hasher.stats()["rejected"] == 1
+    assert hasher.stats()["admitted"] == 0
+
+
+def test_hash_many_waits_for_capacity_instead_of_failing(monkeypatch):
+    hasher = PasswordHasher(max_workers=1, queue_size=0)
+    release = threading.Event()
+    monkeypatch.setattr(hashing.pwd_context, "hash", lambda password: f"hash:{password}")
+
+    async def scenario():
+        login = asyncio.ensure_future(hasher._run("verify", release.wait))
+        await asyncio.sleep(0)
+        batch = asyncio.ensure_future(hasher.hash_many(["a", "b", "c"]))
+        await asyncio.sleep(0.05)
+        assert not batch.done()
+        release.set()
+        await login
+        return await batch
+
+    hashes = asyncio.run(scenario())
+    hasher.shutdown()
+
+    assert hashes == ["hash:a", "hash:b", "hash:c"]
+    assert hasher.stats()["rejected"] == 0
+    assert hasher.stats()["admitted"] == 0
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+from app.common.http_cache import cache_control_for, etag_matches, make_etag
+
+
+def test_etag_changes_with_version_and_matches_if_none_match_forms():
+    updated = datetime(2025, 2, 15, 10, 30, tzinfo=timezone.utc)
+    etag = make_etag("loan", 1, updated, 3)
+
+    assert etag == make_etag("loan", 1, updated, 3)
+    assert etag != make_etag("loan", 1, updated, 4)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"otro", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"otro"', etag)
+
+
+def test_cache_control_depends_on_role():
+    assert cache_control_for(["administrador"], client_max_age=30) == "private, no-cache"
+    assert cache_control_for(["cliente"], client_max_age=30) == "private, max-age=30, must-revalidate"
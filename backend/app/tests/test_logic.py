@@ -0,0 +1,54 @@
+import pytest
+from datetime import datetime, timezone
+
+from app.logic import get_enriched_loans, get_enriched_loan
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeConnection:
+    """Conexión mínima que devuelve filas fijas y cuenta las consultas."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def fetch(self, query, ids):
+        self.queries += 1
+        return [row for row in self.rows if row['id'] in ids]
+
+
+def make_loan(loan_id, total_paid=0.0, payments_made=0):
+    return {
+        "id": loan_id, "user_id": 1, "associate_id": None,
+        "amount": 5000.0, "interest_rate": 15.5, "commission_rate": 5.5,
+        "term_months": 12, "payment_frequency": "quincenal", "status": "active",
+        "created_at": datetime(2025, 1, 10, tzinfo=timezone.utc),
+        "updated_at": datetime(2025, 1, 10, tzinfo=timezone.utc),
+        "user_first_name": "Juan", "user_last_name": "Pérez",
+        "payments_made": payments_made, "total_paid": total_paid,
+    }
+
+
+async def test_get_enriched_loans_uses_a_single_query_and_keeps_order():
+    conn = FakeConnection([make_loan(1), make_loan(2, total_paid=1000.0, payments_made=2), make_loan(3)])
+
+    loans = await get_enriched_loans(conn, [3, 1, 2, 99])
+
+    assert conn.queries == 1
+    assert [loan['id'] for loan in loans] == [3, 1, 2]
+    assert loans[2]['outstanding_balance'] == pytest.approx(loans[1]['outstanding_balance'] - 1000.0, abs=0.01)
+
+
+async def test_get_enriched_loans_with_no_ids_skips_the_database():
+    conn = FakeConnection([])
+
+    assert await get_enriched_loans(conn, []) == []
+    assert conn.queries == 0
+
+
+async def test_get_enriched_loan_returns_none_when_missing():
+    conn = FakeConnection([make_loan(1)])
+
+    assert await get_enriched_loan(conn, 42) is None
+    assert (await get_enriched_loan(conn, 1))['id'] == 1
@@ -0,0 +1,20 @@
+from app.common.metrics import Counter, Histogram, Registry
+
+
+def test_counter_and_histogram_exposition():
+    registry = Registry()
+    requests = registry.register(Counter("demo_requests_total", "Peticiones.", ("route",)))
+    latency = registry.register(Histogram("demo_latency_seconds", "Latencia.", ("route",), buckets=(0.1, 1.0)))
+
+    requests.inc("/api/loans/")
+    requests.inc("/api/loans/")
+    latency.observe(0.05, "/api/loans/")
+    latency.observe(0.5, "/api/loans/")
+    latency.observe(3.0, "/api/loans/")
+
+    text = registry.render()
+    assert 'demo_requests_total{route="/api/loans/"} 2' in text
+    assert 'demo_latency_seconds_bucket{route="/api/loans/",le="0.1"} 1' in text
+    assert 'demo_latency_seconds_bucket{route="/api/loans/",le="1"} 2' in text
+    assert 'demo_latency_seconds_bucket{route="/api/loans/",le="+Inf"} 3' in text
+    assert 'demo_latency_seconds_count{route="/api/loans/"} 3' in text
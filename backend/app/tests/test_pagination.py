@@ -0,0 +1,21 @@
+import pytest
+from fastapi import HTTPException
+
+from app.common.pagination import decode_cursor, encode_cursor, page_count
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+@pytest.mark.parametrize("cursor", ["", "no-es-un-cursor", encode_cursor(1)[:-2] + "!!"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
+
+
+def test_page_count():
+    assert page_count(41, 20) == 3
+    assert page_count(0, 20) == 0
+    assert page_count(10, 0) == 0
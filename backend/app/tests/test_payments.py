@@ -0,0 +1,92 @@
+import contextlib
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.loans import amortization
+from app.loans.payments import post_payments
+from app.loans.schemas import BatchPaymentItem
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_loan(loan_id, status="active", associate_id=1, total_paid=0.0, payments_made=0, interest_rate=0.0):
+    return {
+        "id": loan_id, "user_id": 1, "associate_id": associate_id,
+        "amount": 1000.0, "interest_rate": interest_rate, "commission_rate": 0.0,
+        "term_months": 6, "payment_frequency": "quincenal", "status": status,
+        "created_at": datetime(2025, 1, 10, tzinfo=timezone.utc),
+        "updated_at": datetime(2025, 1, 10, tzinfo=timezone.utc),
+        "user_first_name": "Juan", "user_last_name": "Pérez",
+        "payments_made": payments_made, "total_paid": total_paid,
+    }
+
+
+class FakeConnection:
+    """Simula loans + payments; el trigger de loan_balances se aplica al hacer COPY."""
+
+    def __init__(self, loans):
+        self.loans = {loan["id"]: loan for loan in loans}
+        self.copied = []
+        self.next_id = 500
+
+    async def execute(self, query, *args):
+        assert "FOR UPDATE" in query
+
+    async def fetch(self, query, *args):
+        if "nextval" in query:
+            ids = [{"id": self.next_id + i} for i in range(args[0])]
+            self.next_id += args[0]
+            return ids
+        return [dict(self.loans[loan_id]) for loan_id in args[0] if loan_id in self.loans]
+
+    async def copy_records_to_table(self, table, columns, records):
+        for payment_id, loan_id, amount, payment_date in records:
+            self.copied.append(payment_id)
+            self.loans[loan_id]["total_paid"] += float(amount)
+            self.loans[loan_id]["payments_made"] += 1
+
+    def transaction(self):
+        @contextlib.asynccontextmanager
+        async def transaction():
+            yield
+        return transaction()
+
+
+async def test_post_payments_reports_each_row_and_returns_balances():
+    conn = FakeConnection([
+        make_loan(1, total_paid=900.0), make_loan(2, status="paid"), make_loan(3, associate_id=2),
+        make_loan(4, interest_rate=12.0),
+    ])
+    items = [
+        BatchPaymentItem(loan_id=1, amount_paid=60.0, payment_date=date(2025, 2, 15)),
+        BatchPaymentItem(loan_id=1, amount_paid=60.0),
+        BatchPaymentItem(loan_id=1, amount_paid=40.0),
+        BatchPaymentItem(loan_id=2, amount_paid=10.0),
+        BatchPaymentItem(loan_id=3, amount_paid=10.0),
+        BatchPaymentItem(loan_id=99, amount_paid=10.0),
+        BatchPaymentItem(loan_id=4),
+    ]
+    installment = float(amortization.batch_payment_totals([1000.0], [12.0], [6], ["quincenal"]).payment_amount[0])
+
+    response = await post_payments(conn, items, associate_id=1)
+
+    assert response.created == 3
+    assert [(r.payment_id, r.amount_paid) for r in response.results] == [
+        (500, 60.0), (None, None), (501, 40.0), (None, None), (None, None), (None, None), (502, installment),
+    ]
+    assert all(r.error for r in response.results if r.payment_id is None)
+    assert conn.copied == [500, 501, 502]
+    assert [(b.loan_id, b.payments_made, b.outstanding_balance) for b in response.balances][0] == (1, 2, 0.0)
+    assert response.balances[1].payments_made == 1
+
+
+async def test_amount_that_rounds_to_zero_is_rejected():
+    conn = FakeConnection([make_loan(1)])
+
+    response = await post_payments(conn, [BatchPaymentItem(loan_id=1, amount_paid=0.004), BatchPaymentItem(loan_id=1, amount_paid=0.01)])
+
+    assert response.created == 1
+    assert response.results[0].error == "El monto debe ser de al menos 0.01."
+    assert response.results[1].amount_paid == 0.01
+    assert conn.copied == [500]
@@ -0,0 +1,73 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from app.common import database, query_log
+from app.common.database import InstrumentedConnection
+
+pytestmark = pytest.mark.asyncio
+
+
+@contextlib.asynccontextmanager
+async def _noop_transaction():
+    yield
+
+
+class FakeConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.queries = []
+
+    async def fetch(self, query, *args, **kwargs):
+        self.queries.append(query)
+        if self.fail:
+            raise RuntimeError("canceling statement due to statement timeout")
+        return [("Seq Scan on loans",)]
+
+    def transaction(self, **kwargs):
+        return _noop_transaction()
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def acquire(self, timeout=None):
+        @contextlib.asynccontextmanager
+        async def acquire():
+            yield self.conn
+        return acquire()
+
+
+@pytest.fixture
+def slow(monkeypatch):
+    monkeypatch.setattr(query_log.settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+    monkeypatch.setattr(query_log.settings, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 1)
+    pool = FakePool()
+    monkeypatch.setattr(database, "db_pool", pool)
+    query_log.slow_queries.clear()
+    return pool
+
+
+async def test_failed_query_is_not_recorded(slow):
+    conn = InstrumentedConnection(FakeConnection(fail=True))
+
+    with pytest.raises(RuntimeError):
+        await conn.fetch("SELECT * FROM loans")
+
+    assert list(query_log.slow_queries) == []
+    assert slow.conn.queries == []
+
+
+async def test_explain_runs_on_another_connection_in_background(slow):
+    caller = FakeConnection()
+    conn = InstrumentedConnection(caller)
+
+    await conn.fetch("SELECT * FROM loans WHERE id = $1", 1)
+    entry = query_log.slow_queries[-1]
+    assert caller.queries == ["SELECT * FROM loans WHERE id = $1"]
+
+    await asyncio.gather(*query_log._explain_tasks)
+    assert slow.conn.queries == ["EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM loans WHERE id = $1"]
+    assert entry["plan"] == ["Seq Scan on loans"]
@@ -0,0 +1,52 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.loans.schedules import materialize_active_schedules
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_loan(loan_id):
+    return {
+        "id": loan_id, "amount": Decimal("6000.00"), "interest_rate": Decimal("12.00"), "term_months": Decimal("3.00"),
+        "payment_frequency": "quincenal", "created_at": datetime(2025, 1, 10, tzinfo=timezone.utc),
+    }
+
+
+class FakeConnection:
+    def __init__(self, missing=(7,)):
+        self.missing = missing
+        self.fetched = []
+        self.inserted = None
+
+    async def fetch(self, query, *args):
+        self.fetched.append((query, args))
+        return [make_loan(loan_id) for loan_id in self.missing][:args[2]]
+
+    async def execute(self, query, *columns):
+        self.inserted = columns
+
+
+async def test_missing_schedules_of_active_loans_are_materialized():
+    conn = FakeConnection()
+
+    written = await materialize_active_schedules(conn, date(2025, 2, 1), date(2025, 2, 15), associate_id=3)
+
+    query, args = conn.fetched[0]
+    assert "l.status = 'active'" in query and "NOT EXISTS" in query
+    assert args == (date(2025, 2, 1), date(2025, 2, 15), 501, 3)
+    assert written == 6
+    assert conn.inserted[0] == [7] * 6
+    assert conn.inserted[2][0] == date(2025, 1, 15)
+
+
+async def test_materialization_is_capped_and_logged(caplog):
+    conn = FakeConnection(missing=(1, 2, 3))
+
+    written = await materialize_active_schedules(conn, date(2025, 2, 1), date(2025, 2, 15), limit=2)
+
+    assert written == 12
+    assert sorted(set(conn.inserted[0])) == [1, 2]
+    assert "backfill-schedules" in caplog.text
@@ -0,0 +1,59 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from faker import Faker
+
+from app.auth.schemas import UserImportRow
+from app.synthetic_data import LOAN_COLUMNS, SCHEDULE_COLUMNS, build_loan, build_user
+
+AS_OF = date(2025, 6, 30)
+
+
+def loans(seed, count=300):
+    rng = random.Random(seed)
+    return [build_loan(rng, loan_id, 1, 1, Decimal("5.00"), Decimal("50000.00"), AS_OF, 24) for loan_id in range(1, count + 1)]
+
+
+def test_build_loan_is_reproducible_from_the_seed():
+    assert loans(7) == loans(7)
+    assert loans(7) != loans(8)
+
+
+def test_payments_follow_the_schedule_and_status_matches_history():
+    statuses = set()
+    for loan, schedule, payments in loans(1):
+        loan = dict(zip(LOAN_COLUMNS, loan))
+        schedule = [dict(zip(SCHEDULE_COLUMNS, row)) for row in schedule]
+        statuses.add(loan["status"])
+
+        assert loan["amount"] <= Decimal("50000.00")
+        assert loan["created_at"].date() <= AS_OF
+        # Cada pago corresponde a una cuota vencida, en orden y por su monto.
+        assert len(payments) <= len(schedule)
+        for (_, amount_paid, payment_date), installment in zip(payments, schedule):
+            assert installment["due_date"] <= AS_OF
+            assert amount_paid == installment["amount"]
+            assert loan["created_at"].date() <= payment_date <= AS_OF
+
+        if loan["status"] == "paid":
+            assert len(payments) == len(schedule)
+        if loan["status"] == "pending":
+            assert not payments and all(row["due_date"] > AS_OF for row in schedule)
+        if loan["status"] == "defaulted":
+            assert schedule[len(payments)]["due_date"] < AS_OF
+
+    assert statuses == {"pending", "active", "paid", "defaulted"}
+
+
+def test_build_user_passes_import_validation():
+    fake = Faker("es_MX")
+    fake.seed_instance(3)
+    rng = random.Random(3)
+    users = [build_user(fake, rng, user_id, 1, "$2b$04$" + "x" * 53, AS_OF) for user_id in (1, 2, 123456)]
+
+    for user in users:
+        UserImportRow.model_validate({**user, "roles": ["cliente"]})
+        assert len(user["curp"]) == 18 and len(user["phone_number"]) == 10
+    for field in ("username", "email", "phone_number", "curp"):
+        assert len({user[field] for user in users}) == len(users)
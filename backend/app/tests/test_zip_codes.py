@@ -0,0 +1,97 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.utils.zip_codes import ZipCodeService, load_sepomex_dataset
+
+pytestmark = pytest.mark.asyncio
+
+# Respuestas 200 con un cuerpo que no tiene la forma esperada.
+MALFORMED_BODIES = {
+    "00001": b"<html>Servicio en mantenimiento</html>",
+    "00002": b"[]",
+    "00003": b'{"codigo_postal": "sin datos"}',
+}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Servidor local que imita la API de códigos postales y cuenta las peticiones."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            zip_code = parse_qs(urlparse(self.path).query)["cp"][0]
+            calls.append(zip_code)
+            time.sleep(0.05)
+            data = {"codigo_postal": {"estado": "Ciudad de México", "municipio": "Álvaro Obregón", "colonias": ["San Ángel"]}} if zip_code == "01000" else {}
+            body = MALFORMED_BODIES.get(zip_code) or json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(settings, "ZIP_CODE_API_URL", f"http://127.0.0.1:{server.server_port}/codigo_postal")
+    monkeypatch.setattr(settings, "ZIP_CODE_DATASET_PATH", "")
+    yield calls
+    server.shutdown()
+
+
+async def test_lookup_coalesces_concurrent_requests_and_caches_results(upstream):
+    service = ZipCodeService()
+    try:
+        results = await asyncio.gather(*(service.lookup("01000") for _ in range(5)))
+        assert all(result["municipio"] == "Álvaro Obregón" for result in results)
+        assert await service.lookup("01000") is results[0]
+
+        assert await service.lookup("99999") is None
+        assert await service.lookup("99999") is None
+    finally:
+        await service.close()
+
+    assert upstream == ["01000", "99999"]
+
+
+@pytest.mark.parametrize("zip_code", sorted(MALFORMED_BODIES))
+async def test_malformed_upstream_response_is_a_502(upstream, zip_code):
+    service = ZipCodeService()
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await service.lookup(zip_code)
+    finally:
+        await service.close()
+
+    assert exc_info.value.status_code == 502
+    assert exc_info.value.detail == "Respuesta inválida del servicio de códigos postales"
+
+
+async def test_offline_dataset_is_indexed_by_zip(tmp_path, monkeypatch):
+    path = tmp_path / "CPdescarga.txt"
+    path.write_bytes(
+        "El Catálogo Nacional de Códigos Postales...\n"
+        "d_codigo|d_asenta|d_tipo_asenta|D_mnpio|d_estado|d_ciudad\n"
+        "01000|San Ángel|Colonia|Álvaro Obregón|Ciudad de México|Ciudad de México\n"
+        "01000|Tlacopac|Colonia|Álvaro Obregón|Ciudad de México|Ciudad de México\n".encode("latin-1")
+    )
+    assert load_sepomex_dataset(str(path))["01000"]["colonias"] == ["San Ángel", "Tlacopac"]
+
+    monkeypatch.setattr(settings, "ZIP_CODE_DATASET_PATH", str(path))
+    service = ZipCodeService()
+    service.start()
+    assert service.client is None
+    assert (await service.lookup("01000"))["estado"] == "Ciudad de México"
+    assert await service.lookup("02000") is None
@@ -0,0 +1,139 @@
+# backend/app/utils/availability.py
+"""
+Disponibilidad de los campos únicos de registro (username, email, teléfono, CURP).
+
+`check_availability` resuelve cualquier combinación de campos en una sola
+consulta. Con AVAILABILITY_FILTER_ENABLED se mantiene además un filtro de
+Bloom por campo, cargado al iniciar y actualizado en cada alta: si el valor no
+está en el filtro, seguro está libre y no se consulta Postgres; si está, se
+confirma en la BD. El filtro es local a cada worker y se recarga cada
+AVAILABILITY_FILTER_REFRESH_SECONDS para incluir las altas hechas por otros
+workers o fuera de la API. Mientras tanto podría dar por libre un valor recién
+registrado en otro proceso; las restricciones UNIQUE siguen siendo la
+validación definitiva al registrar.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Mapping, Optional
+
+import asyncpg
+
+from app.core.config import settings
+from app.common import database, metrics
+from app.common.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_FIELDS = ('username', 'email', 'phone_number', 'curp')
+
+
+class AvailabilityFilter:
+    def __init__(self):
+        self.filters: Optional[Dict[str, BloomFilter]] = None
+        self.warmed_at: Optional[float] = None
+        self.filter_answers = 0
+        self.db_checks = 0
+        self._pending: Optional[list] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def warm(self, conn: asyncpg.Connection) -> None:
+        """Construye los filtros recorriendo `users` con un cursor del servidor."""
+        self._pending = []
+        try:
+            total = await conn.fetchval("SELECT COUNT(*) FROM users")
+            capacity = max(10000, total * 2)
+            filters = {field: BloomFilter(capacity, settings.AVAILABILITY_FILTER_ERROR_RATE) for field in AVAILABILITY_FIELDS}
+            async with conn.transaction(readonly=True):
+                async for record in conn.cursor(f"SELECT {', '.join(AVAILABILITY_FIELDS)} FROM users", prefetch=5000):
+                    for field in AVAILABILITY_FIELDS:
+                        if record[field] is not None:
+                            filters[field].add(record[field])
+            # Altas registradas mientras se recorría la tabla.
+            for user in self._pending:
+                self._add_to(filters, user)
+        finally:
+            self._pending = None
+        self.filters = filters
+        self.warmed_at = time.monotonic()
+        logger.info(f"Filtro de disponibilidad cargado con {total} usuarios.")
+
+    @staticmethod
+    def _add_to(filters: Dict[str, BloomFilter], user: Mapping) -> None:
+        for field in AVAILABILITY_FIELDS:
+            if user.get(field) is not None:
+                filters[field].add(user[field])
+
+    def add(self, users: Iterable[Mapping]) -> None:
+        """Registra en el filtro los valores de usuarios recién creados."""
+        for user in users:
+            if self.filters is not None:
+                self._add_to(self.filters, user)
+            if self._pending is not None:
+                self._pending.append(user)
+
+    def is_free(self, field: str, value: str) -> bool:
+        """True sólo si el valor seguro no está registrado."""
+        return self.filters is not None and value not in self.filters[field]
+
+    def maybe_refresh(self) -> None:
+        if self.warmed_at is None or self._refresh_task is not None:
+            return
+        if time.monotonic() - self.warmed_at < settings.AVAILABILITY_FILTER_REFRESH_SECONDS:
+            return
+        self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        try:
+            async with database.get_db_context() as conn:
+                await self.warm(conn)
+        except Exception as e:
+            logger.error(f"No se pudo recargar el filtro de disponibilidad: {e}")
+            self.warmed_at = time.monotonic()
+        finally:
+            self._refresh_task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.filters is not None,
+            "values": sum(len(f) for f in self.filters.values()) if self.filters else 0,
+            "age_seconds": time.monotonic() - self.warmed_at if self.warmed_at is not None else 0,
+            "filter_answers": self.filter_answers,
+            "db_checks": self.db_checks,
+        }
+
+
+availability_filter = AvailabilityFilter()
+metrics.register_stats_gauges("credinet_availability_filter", "Filtro de Bloom de disponibilidad de este worker.", availability_filter.stats)
+
+
+async def find_existing(conn: asyncpg.Connection, values: Mapping[str, str]) -> Dict[str, bool]:
+    """Para cada campo de `values`, si ya hay un usuario con ese valor (una sola consulta)."""
+    params = []
+    selects = []
+    for field, value in values.items():
+        params.append(value)
+        selects.append(f"EXISTS (SELECT 1 FROM users WHERE {field} = ${len(params)}) AS {field}")
+    return dict(await conn.fetchrow(f"SELECT {', '.join(selects)}", *params))
+
+
+async def check_availability(values: Mapping[str, str]) -> Dict[str, bool]:
+    """
+    Devuelve {campo: existe}. Los valores que el filtro descarta no llegan a la
+    BD; si los descarta todos, ni siquiera se toma una conexión del pool.
+    """
+    availability_filter.maybe_refresh()
+    exists = {}
+    to_check = {}
+    for field, value in values.items():
+        if availability_filter.is_free(field, value):
+            exists[field] = False
+        else:
+            to_check[field] = value
+    availability_filter.filter_answers += len(exists)
+
+    if to_check:
+        availability_filter.db_checks += 1
+        async with database.get_db_context() as conn:
+            exists.update(await find_existing(conn, to_check))
+    return {field: exists[field] for field in values}
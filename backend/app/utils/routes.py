@@ -1,12 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
-import httpx
+from typing import Optional
 import asyncpg
-from app.common.database import get_db
+from app.common.database import get_db, get_pool_stats
+from app.common.query_log import get_slow_queries
+from app.auth.jwt import require_roles
+from app.utils.availability import check_availability
+from app.utils.zip_codes import zip_code_service
 
 router = APIRouter()
 
-ZIP_CODE_API_URL = "https://api.tau.com.mx/dipomex/v1/codigo_postal"
-
 @router.get("/check-curp/{curp}", summary="Verificar si una CURP ya existe")
 async def check_curp_exists(curp: str, conn: asyncpg.Connection = Depends(get_db)):
     """
@@ -45,43 +47,66 @@ async def check_phone_exists(phone_number: str, conn: asyncpg.Connection = Depen
     return {"exists": record is not None}
 
 
+@router.get("/check-availability", summary="Verificar varios campos de registro a la vez")
+async def check_fields_availability(
+    username: Optional[str] = None,
+    email: Optional[str] = None,
+    phone_number: Optional[str] = None,
+    curp: Optional[str] = None,
+):
+    """
+    Verifica en una sola consulta cualquier combinación de username, email,
+    teléfono y CURP. Devuelve `{"campo": {"exists": bool}}` sólo para los
+    campos indicados.
+    """
+    values = {}
+    if username:
+        values["username"] = username
+    if email:
+        values["email"] = email
+    if phone_number:
+        if not phone_number.isdigit() or len(phone_number) != 10:
+            raise HTTPException(status_code=400, detail="El número de teléfono debe tener 10 dígitos.")
+        values["phone_number"] = phone_number
+    if curp:
+        if len(curp) != 18:
+            raise HTTPException(status_code=400, detail="La CURP debe tener 18 caracteres.")
+        values["curp"] = curp.upper()
+    if not values:
+        raise HTTPException(status_code=400, detail="Indica al menos uno de username, email, phone_number o curp.")
+
+    exists = await check_availability(values)
+    return {field: {"exists": value} for field, value in exists.items()}
+
+
+@router.get("/db-pool", summary="Estado del pool de conexiones", dependencies=[Depends(require_roles(["administrador"]))])
+async def read_db_pool_stats():
+    """
+    Devuelve el tamaño del pool de este worker, conexiones en uso y libres,
+    y las esperas y timeouts al adquirir conexiones.
+    """
+    return get_pool_stats()
+
+
+@router.get("/slow-queries", summary="Consultas lentas recientes", dependencies=[Depends(require_roles(["administrador"]))])
+async def read_slow_queries():
+    """
+    Devuelve las consultas que superaron SLOW_QUERY_THRESHOLD_MS en este worker
+    (más recientes primero), con su plan de ejecución cuando fue muestreado.
+    """
+    return get_slow_queries()
+
+
 @router.get("/zip-code/{zip_code}", summary="Consultar información de un código postal")
 async def get_zip_code_info(zip_code: str):
     """
-    Consulta la información de un código postal utilizando una API externa.
+    Consulta la información de un código postal (API externa con caché local,
+    o el archivo de SEPOMEX si está configurado).
     """
     if not zip_code.isdigit() or len(zip_code) != 5:
         raise HTTPException(status_code=400, detail="El código postal debe ser un número de 5 dígitos.")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            # Preparamos los headers que la API externa espera
-            headers = {
-                'Content-Type': 'application/json',
-                'APIKEY': '77b8b04b005aaff3abe8300c9d43f503f73ffe26'
-            }
-            
-            # Hacemos la petición GET con los parámetros y headers correctos
-            response = await client.get(f"{ZIP_CODE_API_URL}", params={"cp": zip_code}, headers=headers)
-            
-            response.raise_for_status()  # Lanza una excepción para respuestas 4xx/5xx
-            data = response.json()
-            
-            # La API devuelve los datos anidados bajo la clave 'codigo_postal'
-            cp_data = data.get("codigo_postal", {})
-
-            if not cp_data:
-                raise HTTPException(status_code=404, detail="No se encontró información para el código postal.")
-
-            return {
-                "estado": cp_data.get("estado"),
-                "municipio": cp_data.get("municipio"),
-                "colonias": cp_data.get("colonias", []),
-            }
-
-        except httpx.HTTPStatusError as exc:
-            # Capturamos el detalle del error de la API externa para más claridad
-            error_detail = exc.response.text
-            raise HTTPException(status_code=exc.response.status_code, detail=f"Error al consultar el código postal: {error_detail}")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error interno del servidor: {str(e)}")
+    info = await zip_code_service.lookup(zip_code)
+    if info is None:
+        raise HTTPException(status_code=404, detail="No se encontró información para el código postal.")
+    return info
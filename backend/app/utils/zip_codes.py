@@ -0,0 +1,134 @@
+# backend/app/utils/zip_codes.py
+"""
+Consulta de códigos postales (estado, municipio y colonias).
+
+Por defecto se consulta la API externa con un único cliente HTTP compartido
+(conexiones reutilizadas entre peticiones) y las respuestas se guardan en un
+caché en memoria: los códigos encontrados por ZIP_CODE_CACHE_TTL_SECONDS y los
+inexistentes por ZIP_CODE_NEGATIVE_CACHE_TTL_SECONDS. Las consultas
+simultáneas del mismo código comparten una sola petición a la API.
+
+Si ZIP_CODE_DATASET_PATH apunta al archivo de SEPOMEX (CPdescarga.txt,
+separado por `|`), se carga al iniciar y se responde sólo con él, sin red.
+"""
+import asyncio
+import csv
+import logging
+from typing import Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.common import metrics
+from app.common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+_NOT_FOUND = object()
+
+
+def load_sepomex_dataset(path: str) -> Dict[str, dict]:
+    """Indexa por código postal el archivo de SEPOMEX (encabezado `d_codigo|d_asenta|...`)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except UnicodeDecodeError:
+        # El archivo oficial se publica en Latin-1.
+        with open(path, encoding="latin-1") as f:
+            lines = f.read().splitlines()
+
+    # El archivo oficial trae una línea de aviso antes del encabezado.
+    start = next((i for i, line in enumerate(lines) if line.startswith("d_codigo")), None)
+    if start is None:
+        raise ValueError(f"{path} no tiene el encabezado de SEPOMEX (d_codigo|d_asenta|...).")
+
+    dataset: Dict[str, dict] = {}
+    for row in csv.DictReader(lines[start:], delimiter="|"):
+        zip_code = (row.get("d_codigo") or "").strip().zfill(5)
+        entry = dataset.setdefault(zip_code, {
+            "estado": row.get("d_estado"),
+            "municipio": row.get("D_mnpio"),
+            "colonias": [],
+        })
+        colonia = row.get("d_asenta")
+        if colonia and colonia not in entry["colonias"]:
+            entry["colonias"].append(colonia)
+    return dataset
+
+
+class ZipCodeService:
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.dataset: Optional[Dict[str, dict]] = None
+        self.cache = TTLCache(maxsize=settings.ZIP_CODE_CACHE_MAX_SIZE, ttl=settings.ZIP_CODE_CACHE_TTL_SECONDS)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def start(self):
+        if settings.ZIP_CODE_DATASET_PATH:
+            self.dataset = load_sepomex_dataset(settings.ZIP_CODE_DATASET_PATH)
+            logger.info(f"Códigos postales en modo sin conexión: {len(self.dataset)} códigos cargados de {settings.ZIP_CODE_DATASET_PATH}.")
+        elif self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=settings.ZIP_CODE_API_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                headers={'Content-Type': 'application/json', 'APIKEY': settings.ZIP_CODE_API_KEY},
+            )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def lookup(self, zip_code: str) -> Optional[dict]:
+        """Datos del código postal, o None si no existe."""
+        if self.dataset is not None:
+            return self.dataset.get(zip_code)
+
+        cached = self.cache.get(zip_code)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else cached
+
+        task = self._inflight.get(zip_code)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(zip_code))
+            self._inflight[zip_code] = task
+            task.add_done_callback(lambda _: self._inflight.pop(zip_code, None))
+        # shield: si un cliente se desconecta, la consulta sigue para los demás.
+        return await asyncio.shield(task)
+
+    async def _fetch(self, zip_code: str) -> Optional[dict]:
+        if self.client is None:
+            self.start()
+        try:
+            response = await self.client.get(settings.ZIP_CODE_API_URL, params={"cp": zip_code})
+            response.raise_for_status()
+            cp_data = response.json().get("codigo_postal") or {}
+            if not isinstance(cp_data, dict):
+                raise ValueError(f"codigo_postal no es un objeto: {cp_data!r}")
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == 404:
+                cp_data = {}
+            else:
+                raise HTTPException(status_code=exc.response.status_code, detail=f"Error al consultar el código postal: {exc.response.text}")
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=f"No se pudo consultar el servicio de códigos postales: {exc}")
+        except (ValueError, AttributeError):
+            # Cuerpo que no es JSON (ValueError) o JSON sin la forma esperada (AttributeError).
+            raise HTTPException(status_code=502, detail="Respuesta inválida del servicio de códigos postales")
+
+        if not cp_data:
+            self.cache.set(zip_code, _NOT_FOUND, ttl=settings.ZIP_CODE_NEGATIVE_CACHE_TTL_SECONDS)
+            return None
+
+        result = {
+            "estado": cp_data.get("estado"),
+            "municipio": cp_data.get("municipio"),
+            "colonias": cp_data.get("colonias", []),
+        }
+        self.cache.set(zip_code, result)
+        return result
+
+
+zip_code_service = ZipCodeService()
+metrics.register_stats_gauges("credinet_zip_code_cache", "Caché de códigos postales de este worker.", zip_code_service.cache.stats)
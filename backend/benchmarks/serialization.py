@@ -0,0 +1,126 @@
+"""
+Benchmark de serialización de respuestas: CPU por página de 100 filas.
+
+Compara, con el mismo camino que usa FastAPI (`serialize_response` con
+`dump_json`, el núcleo en Rust de Pydantic):
+
+- antes: el handler construye un modelo por fila (`model_validate`) y FastAPI
+  vuelve a validar y serializar la página, con los modelos de respuesta
+  anteriores (en usuarios, `email: EmailStr`, que se volvía a validar al leer);
+- ahora: el handler devuelve dicts y `response_model` valida y serializa una
+  sola vez;
+- orjson (si está instalado): volcado directo de los dicts sin validar, como
+  cota inferior de referencia.
+
+Uso (desde backend/): python -m benchmarks.serialization [--rows 100] [--repeat 2000]
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import EmailStr
+
+from app.auth.routes import PaginatedUserResponse
+from app.auth.schemas import UserResponse
+from app.loans.routes import PaginatedLoanResponse
+from app.loans.schemas import LoanResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class BaselineUserResponse(UserResponse):
+    """`UserResponse` antes del cambio: el email se validaba también al responder."""
+    email: Optional[EmailStr] = None
+
+
+class BaselinePaginatedUserResponse(PaginatedUserResponse):
+    items: List[BaselineUserResponse]
+
+
+def user_row(i):
+    return {
+        "id": i, "username": f"usuario{i}", "password_hash": "$2b$12$" + "x" * 53,
+        "first_name": "Juan", "last_name": "Pérez", "email": f"usuario{i}@example.com",
+        "phone_number": "5512345678", "birth_date": date(1990, 1, 1), "curp": "PEPJ900101HDFRRN09",
+        "profile_picture_url": None, "address_street": "Av. Reforma", "address_ext_num": "100",
+        "address_int_num": None, "address_colonia": "Juárez", "address_zip_code": "06600",
+        "address_state": "Ciudad de México", "associate_id": 1, "roles": ["cliente"],
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc), "updated_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+def loan_row(i):
+    return {
+        "id": i, "user_id": i, "associate_id": 1, "amount": Decimal("5000.00"), "interest_rate": Decimal("15.50"),
+        "commission_rate": Decimal("5.50"), "term_months": Decimal("12.00"), "payment_frequency": "quincenal",
+        "status": "active", "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "updated_at": datetime(2025, 1, 1, tzinfo=timezone.utc), "user_first_name": "Juan", "user_last_name": "Pérez",
+        "payments_made": 3, "total_paid": Decimal("1350.00"), "last_payment_date": date(2025, 2, 15),
+        "scheduled_total_due": None, "outstanding_balance": 4057.64,
+    }
+
+
+def page(items):
+    return {"items": items, "total": 5000, "page": 1, "limit": len(items), "pages": 50, "next_cursor": None, "total_is_estimate": False}
+
+
+def orjson_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def measure(fn, repeat):
+    fn()
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) / repeat * 1e6
+
+
+def run(name, page_model, baseline_page_model, baseline_item_model, rows, repeat):
+    loop = asyncio.new_event_loop()
+
+    def serializer(model):
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+        return lambda content: loop.run_until_complete(serialize_response(field=field, response_content=content, dump_json=True))
+
+    serialize_before, serialize_now = serializer(baseline_page_model), serializer(page_model)
+    results = {
+        "antes (model_validate por fila + response_model)": measure(
+            lambda: serialize_before(page([baseline_item_model.model_validate(row) for row in rows])), repeat),
+        "ahora (dicts + response_model)": measure(lambda: serialize_now(page(rows)), repeat),
+    }
+    if orjson is not None:
+        results["orjson sin validar (referencia)"] = measure(lambda: orjson.dumps(page(rows), default=orjson_default), repeat)
+    loop.close()
+
+    print(f"\n{name}: {len(rows)} filas, {repeat} repeticiones (µs de CPU por página)")
+    baseline = next(iter(results.values()))
+    for label, micros in results.items():
+        print(f"  {label:<50} {micros:9.1f} µs  ({micros / baseline:5.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    run("GET /api/auth/users", PaginatedUserResponse, BaselinePaginatedUserResponse, BaselineUserResponse,
+        [user_row(i) for i in range(args.rows)], args.repeat)
+    # LoanResponse no cambió: sólo se mide quitar el model_validate por fila.
+    run("GET /api/loans/", PaginatedLoanResponse, PaginatedLoanResponse, LoanResponse,
+        [loan_row(i) for i in range(args.rows)], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,12 @@ import typer
 import bcrypt
 import asyncpg
 import sys
+from datetime import date
+from pathlib import Path
 from app.common.database import DB_CONFIG
+from app import synthetic_data
+from app.auth import bulk_import
+from app.loans import ledger, schedules
 
 app = typer.Typer()
 
@@ -53,5 +58,143 @@ def create(username: str = typer.Option(..., "--username", help="Nombre de usuar
     """
     asyncio.run(_create_user(username, password))
 
+async def _verify_balances(repair: bool):
+    """Compara loan_balances contra payments y, opcionalmente, repara las desviaciones."""
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        drift = await ledger.find_loan_balance_drift(conn)
+        if not drift:
+            print("✅ loan_balances coincide con la tabla payments.")
+            return
+        for row in drift:
+            print(
+                f"⚠️  Préstamo {row['loan_id']}: "
+                f"pagos {row['ledger_payments_made']} -> {row['payments_made']}, "
+                f"total {row['ledger_total_paid']} -> {row['total_paid']}, "
+                f"último pago {row['ledger_last_payment_date']} -> {row['last_payment_date']}"
+            )
+        if not repair:
+            print(f"❌ {len(drift)} préstamo(s) con desviación. Ejecuta con --repair para corregirlos.", file=sys.stderr)
+            sys.exit(1)
+        written = await ledger.rebuild_loan_balances(conn, [row['loan_id'] for row in drift])
+        print(f"✅ {written} préstamo(s) reparados.")
+    finally:
+        await conn.close()
+
+async def _backfill_balances():
+    """Reconstruye loan_balances completo a partir de payments."""
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        written = await ledger.rebuild_loan_balances(conn)
+        print(f"✅ loan_balances reconstruido ({written} préstamo(s) actualizados).")
+    finally:
+        await conn.close()
+
+async def _backfill_schedules():
+    """Materializa en loan_schedule las tablas de amortización que falten."""
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        written = await schedules.backfill_loan_schedules(conn)
+        print(f"✅ {written} cuota(s) escritas en loan_schedule.")
+    finally:
+        await conn.close()
+
+async def _import_users(path: Path, fmt: str):
+    """Importa usuarios desde un archivo CSV/NDJSON y reporta los errores por fila."""
+    try:
+        rows = bulk_import.parse_rows(path.read_text(encoding='utf-8-sig'), fmt)
+    except (UnicodeDecodeError, ValueError) as e:
+        print(f"❌ No se pudo leer el archivo: {e}", file=sys.stderr)
+        sys.exit(1)
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        result = await bulk_import.import_users(conn, rows)
+    finally:
+        await conn.close()
+    for error in result.errors:
+        field = f" [{error.field}]" if error.field else ""
+        print(f"⚠️  Fila {error.row} ({error.username or '-'}){field}: {error.message}", file=sys.stderr)
+    print(f"✅ {result.created} de {result.received} usuario(s) importados.")
+    if result.errors:
+        sys.exit(1)
+
+@app.command("import-users")
+def import_users(path: Path = typer.Argument(..., exists=True, dir_okay=False, help="Archivo CSV o NDJSON."),
+                 fmt: str = typer.Option(None, "--format", help="csv o ndjson; por defecto, la extensión del archivo.")):
+    """
+    Alta masiva de usuarios. Las filas inválidas se omiten y se listan al final;
+    termina con código 1 si hubo alguna.
+    """
+    asyncio.run(_import_users(path, fmt or path.suffix.lstrip('.').lower()))
+
+async def _backfill_associate_stats():
+    """Reconstruye associate_portfolio_stats a partir de loans y loan_balances."""
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        written = await ledger.rebuild_associate_stats(conn)
+        print(f"✅ associate_portfolio_stats reconstruido ({written} asociado(s) con cartera).")
+    finally:
+        await conn.close()
+
+async def _generate_data(associates, clients, loans, seed, months_back, as_of, password):
+    """Genera y carga el conjunto de datos sintético."""
+    conn = await asyncpg.connect(**DB_CONFIG)
+    try:
+        # Un solo hash para todos: bcrypt por usuario dominaría el tiempo de carga.
+        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        counts = await synthetic_data.generate_dataset(
+            conn, associates=associates, clients=clients, loans=loans, seed=seed, password_hash=password_hash,
+            as_of=as_of, months_back=months_back, progress=lambda message: print(f"   {message}")
+        )
+        print("✅ Datos generados: " + ", ".join(f"{count} {table}" for table, count in counts.items()) + ".")
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        await conn.close()
+
+@app.command("generate-data")
+def generate_data(associates: int = typer.Option(50, "--associates", min=0, help="Asociados (cada uno con su usuario)."),
+                  clients: int = typer.Option(10000, "--clients", min=0, help="Clientes."),
+                  loans: int = typer.Option(20000, "--loans", min=0, help="Préstamos, con su tabla de amortización y pagos."),
+                  seed: int = typer.Option(42, "--seed", help="Semilla; la misma semilla reproduce los mismos datos."),
+                  months_back: int = typer.Option(24, "--months-back", min=1, help="Antigüedad máxima de los préstamos, en meses."),
+                  as_of: str = typer.Option(None, "--as-of", help="Fecha de corte AAAA-MM-DD (por defecto, hoy)."),
+                  password: str = typer.Option("Sparrow20", "--password", help="Contraseña de todos los usuarios generados.")):
+    """
+    Genera un conjunto de datos sintético para pruebas de capacidad y lo carga
+    con COPY. Bloquea loans y payments mientras dura: correr sin tráfico en la API.
+    """
+    asyncio.run(_generate_data(associates, clients, loans, seed, months_back, date.fromisoformat(as_of) if as_of else date.today(), password))
+
+@app.command("verify-balances")
+def verify_balances(repair: bool = typer.Option(False, "--repair", help="Corrige las desviaciones encontradas.")):
+    """
+    Verifica que el libro mayor loan_balances coincida con los pagos registrados.
+    Termina con código 1 si hay desviaciones y no se pidió --repair.
+    """
+    asyncio.run(_verify_balances(repair))
+
+@app.command("backfill-balances")
+def backfill_balances():
+    """
+    Recalcula loan_balances para todos los préstamos (p. ej. tras migrar una BD existente).
+    """
+    asyncio.run(_backfill_balances())
+
+@app.command("backfill-associate-stats")
+def backfill_associate_stats():
+    """
+    Recalcula el resumen de cartera de todos los asociados (p. ej. tras migrar una BD existente).
+    """
+    asyncio.run(_backfill_associate_stats())
+
+@app.command("backfill-schedules")
+def backfill_schedules():
+    """
+    Genera la tabla de amortización de todos los préstamos que aún no la tienen en loan_schedule.
+    """
+    asyncio.run(_backfill_schedules())
+
 if __name__ == "__main__":
     app()
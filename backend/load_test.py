@@ -0,0 +1,299 @@
+"""
+Prueba de carga de la API (complemento de smoke_test.py).
+
+smoke_test.py comprueba una vez, en secuencia, que cada endpoint responde lo
+correcto. Este script genera carga concurrente sobre los mismos endpoints con
+usuarios virtuales de cada rol durante un tiempo fijo, y reporta por endpoint
+el throughput y las latencias p50/p95/p99. Los resultados se guardan en JSON
+para comparar corridas (`--compare`).
+
+Cada usuario virtual inicia sesión y repite acciones de su perfil elegidas al
+azar según su peso (ver PROFILES). Con `--revalidate` reenvía el ETag recibido
+en If-None-Match, como hace un navegador.
+
+Uso, con el stack de docker compose levantado:
+
+    python load_test.py --concurrency 50 --duration 60 --output base.json
+    python load_test.py --concurrency 50 --duration 60 --output nuevo.json --compare base.json
+
+Desde el contenedor del backend:
+
+    docker compose exec backend python load_test.py --base-url http://localhost:8000/api
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+API_URL = os.getenv("LOAD_TEST_API_URL", "http://localhost:8001/api")
+PASSWORD = os.getenv("LOAD_TEST_PASSWORD", "Sparrow20")
+
+# Usuarios del seed, los mismos que usa smoke_test.py.
+DEFAULT_USERS = {
+    "administrador": ["admin"],
+    "asociado": ["asociado_test"],
+    "cliente": ["sofia.vargas"],
+}
+
+# Acciones de cada perfil y su peso relativo.
+PROFILES = {
+    "administrador": {"loans_list": 4, "loans_summary": 2, "loan_detail": 3, "loan_schedule": 2, "login": 1},
+    "asociado": {"associate_dashboard": 4, "loans_list": 3, "loan_detail": 3, "loan_schedule": 2, "login": 1},
+    "cliente": {"client_dashboard": 5, "loan_detail": 3, "loan_schedule": 3, "login": 1},
+}
+DEFAULT_MIX = "administrador=1,asociado=2,cliente=7"
+
+
+class Recorder:
+    """Acumula latencias y códigos de estado por endpoint a partir de `record_from`."""
+
+    def __init__(self, record_from: float):
+        self.record_from = record_from
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def record(self, label: str, started: float, status) -> None:
+        if started >= self.record_from:
+            self.latencies[label].append(time.perf_counter() - started)
+            self.statuses[label][str(status)] += 1
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, profile: str, username: str, args, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.profile = profile
+        self.username = username
+        self.args = args
+        self.rng = rng
+        self.actions = list(PROFILES[profile])
+        self.weights = list(PROFILES[profile].values())
+        self.headers = {}
+        self.loan_ids = []
+        self.etags = {}
+
+    async def request(self, label: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(label, started, f"error:{type(e).__name__}")
+            return None
+        self.recorder.record(label, started, response.status_code)
+        if response.status_code == 401 and label != "POST /auth/login":
+            await self.login()
+        return response
+
+    async def get(self, label: str, path: str, **kwargs):
+        headers = dict(self.headers)
+        if self.args.revalidate and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        response = await self.request(label, "GET", path, headers=headers, **kwargs)
+        if response is not None and response.headers.get("ETag"):
+            self.etags[path] = response.headers["ETag"]
+        return response if response is not None and response.status_code == 200 else None
+
+    async def login(self) -> None:
+        response = await self.request("POST /auth/login", "POST", "/auth/login", data={"username": self.username, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def loans_list(self) -> None:
+        response = await self.get("GET /loans/", "/loans/", params={"page": self.rng.randint(1, 5), "limit": 20})
+        if response is not None:
+            self._remember_loans(loan["id"] for loan in response.json()["items"])
+
+    async def loans_summary(self) -> None:
+        await self.get("GET /loans/summary", "/loans/summary")
+
+    async def associate_dashboard(self) -> None:
+        response = await self.get("GET /associates/dashboard", "/associates/dashboard")
+        if response is not None:
+            self._remember_loans(loan["id"] for loan in response.json()["loans"])
+
+    async def client_dashboard(self) -> None:
+        response = await self.get("GET /auth/me/dashboard", "/auth/me/dashboard")
+        if response is not None:
+            self._remember_loans(loan["id"] for loan in response.json()["loans"])
+
+    async def loan_detail(self) -> None:
+        if self.loan_ids:
+            await self.get("GET /loans/{id}", f"/loans/{self.rng.choice(self.loan_ids)}")
+
+    async def loan_schedule(self) -> None:
+        if self.loan_ids:
+            await self.get("GET /loans/{id}/schedule", f"/loans/{self.rng.choice(self.loan_ids)}/schedule")
+
+    def _remember_loans(self, ids) -> None:
+        self.loan_ids = list(dict.fromkeys([*self.loan_ids, *ids]))[-200:]
+
+    async def run(self, deadline: float) -> None:
+        await self.login()
+        # Primera carga para conocer ids de préstamos, como haría la interfaz.
+        await (self.client_dashboard() if self.profile == "cliente" else
+               self.associate_dashboard() if self.profile == "asociado" else self.loans_list())
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            await getattr(self, action)()
+            if self.args.think_ms:
+                await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_ms) / 1000)
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentil por rango más cercano sobre valores ya ordenados."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def is_error(status: str) -> bool:
+    return not status.isdigit() or int(status) >= 400
+
+
+def summarize_latencies(latencies, statuses: Counter, elapsed: float) -> dict:
+    values = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if is_error(status))
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(values) / len(values), 2) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 2),
+        "p95_ms": round(1000 * percentile(values, 95), 2),
+        "p99_ms": round(1000 * percentile(values, 99), 2),
+        "max_ms": round(1000 * values[-1], 2) if values else 0.0,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {
+        label: summarize_latencies(recorder.latencies[label], recorder.statuses[label], elapsed)
+        for label in sorted(recorder.latencies)
+    }
+    all_statuses = sum(recorder.statuses.values(), Counter())
+    total = summarize_latencies([v for values in recorder.latencies.values() for v in values], all_statuses, elapsed)
+    return {"endpoints": endpoints, "total": total}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        profile, _, weight = part.partition("=")
+        if profile.strip() not in PROFILES:
+            raise SystemExit(f"Perfil desconocido: {profile}. Usa uno de {', '.join(PROFILES)}.")
+        weights[profile.strip()] = float(weight or 1)
+    return weights
+
+
+def parse_users(values) -> dict:
+    if not values:
+        return DEFAULT_USERS
+    users = defaultdict(list)
+    for value in values:
+        profile, _, username = value.partition("=")
+        if profile not in PROFILES or not username:
+            raise SystemExit(f"--user debe ser PERFIL=USUARIO con PERFIL en {', '.join(PROFILES)}.")
+        users[profile].append(username)
+    return {profile: users.get(profile) or DEFAULT_USERS[profile] for profile in PROFILES}
+
+
+def print_report(results: dict, baseline: dict = None) -> None:
+    header = f"{'endpoint':<28}{'req':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>7}"
+    if baseline:
+        header += f"{'Δ rps':>9}{'Δ p95':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = [*results["endpoints"].items(), ("TOTAL", results["total"])]
+    for label, stats in rows:
+        line = (f"{label:<28}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+                f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{100 * stats['error_rate']:>7.2f}")
+        if baseline:
+            base = baseline["total"] if label == "TOTAL" else baseline["endpoints"].get(label)
+            if base and base["throughput_rps"] and base["p95_ms"]:
+                line += (f"{stats['throughput_rps'] / base['throughput_rps'] - 1:>+9.0%}"
+                         f"{stats['p95_ms'] / base['p95_ms'] - 1:>+9.0%}")
+        print(line)
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    users = parse_users(args.user)
+    rng = random.Random(args.seed)
+    profiles = rng.choices(list(mix), list(mix.values()), k=args.concurrency)
+
+    start = time.perf_counter()
+    recorder = Recorder(record_from=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        counters = Counter()
+        workers = []
+        for profile in profiles:
+            pool = users[profile]
+            username = pool[counters[profile] % len(pool)]
+            counters[profile] += 1
+            workers.append(VirtualUser(client, recorder, profile, username, args, random.Random(rng.random())).run(deadline))
+        await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - recorder.record_from
+
+    results = summarize(recorder, elapsed)
+    results["meta"] = {
+        "label": args.label,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "measured_s": round(elapsed, 2),
+        "warmup_s": args.warmup,
+        "think_ms": args.think_ms,
+        "revalidate": args.revalidate,
+        "seed": args.seed,
+        "virtual_users": dict(Counter(profiles)),
+        "profiles": PROFILES,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga concurrente de la API de Credinet.")
+    parser.add_argument("--base-url", default=API_URL, help=f"URL base de la API (default: {API_URL}).")
+    parser.add_argument("--concurrency", type=int, default=20, help="Usuarios virtuales simultáneos.")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos medidos.")
+    parser.add_argument("--warmup", type=float, default=5, help="Segundos iniciales que no se miden.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Proporción de perfiles (default: {DEFAULT_MIX}).")
+    parser.add_argument("--user", action="append", metavar="PERFIL=USUARIO", help="Usuario para un perfil; se puede repetir. Por defecto, los del seed.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Pausa media entre acciones de un usuario virtual.")
+    parser.add_argument("--revalidate", action="store_true", help="Reenviar ETags en If-None-Match.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default=None, help="Etiqueta libre para identificar la corrida.")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados.")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para mostrar diferencias.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Tasa de error total por encima de la cual se sale con código 1.")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+    if results["total"]["error_rate"] > args.max_error_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
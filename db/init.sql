@@ -1,3 +1,6 @@
+-- Extensión de trigramas para las búsquedas ILIKE '%término%' indexadas.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- =============================================================================
 -- FUNCIÓN Y TRIGGERS PARA TIMESTAMPS AUTOMÁTICOS
 -- =============================================================================
@@ -97,6 +100,198 @@ CREATE TABLE IF NOT EXISTS payments (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS idx_payments_loan_id ON payments(loan_id);
+CREATE INDEX IF NOT EXISTS idx_loans_associate_id ON loans(associate_id, id);
+CREATE INDEX IF NOT EXISTS idx_loans_user_id ON loans(user_id);
+
+-- Índices de trigramas para el Filtro Universal Simple (búsqueda por subcadena).
+CREATE INDEX IF NOT EXISTS idx_users_username_trgm ON users USING gin (username gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_users_phone_number_trgm ON users USING gin (phone_number gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_associates_name_trgm ON associates USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_associates_contact_person_trgm ON associates USING gin (contact_person gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_associates_contact_email_trgm ON associates USING gin (contact_email gin_trgm_ops);
+
+-- Libro mayor por préstamo: agregados de pagos mantenidos por triggers sobre `payments`.
+CREATE TABLE IF NOT EXISTS loan_balances (
+    loan_id INTEGER PRIMARY KEY REFERENCES loans(id) ON DELETE CASCADE,
+    payments_made INTEGER NOT NULL DEFAULT 0,
+    total_paid NUMERIC(12, 2) NOT NULL DEFAULT 0.00,
+    last_payment_date DATE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tabla de amortización materializada por préstamo (escrita por el backend).
+CREATE TABLE IF NOT EXISTS loan_schedule (
+    loan_id INTEGER NOT NULL REFERENCES loans(id) ON DELETE CASCADE,
+    payment_number INTEGER NOT NULL,
+    due_date DATE NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    principal NUMERIC(12, 2) NOT NULL,
+    interest NUMERIC(12, 2) NOT NULL,
+    balance NUMERIC(12, 2) NOT NULL,
+    PRIMARY KEY (loan_id, payment_number)
+);
+CREATE INDEX IF NOT EXISTS idx_loan_schedule_due_date ON loan_schedule(due_date);
+
+-- Resumen de cartera por asociado, mantenido por triggers sobre `loans` y `loan_balances`.
+-- Saldo pendiente = total_due - total_paid.
+CREATE TABLE IF NOT EXISTS associate_portfolio_stats (
+    associate_id INTEGER PRIMARY KEY REFERENCES associates(id) ON DELETE CASCADE,
+    total_loans INTEGER NOT NULL DEFAULT 0,
+    active_loans INTEGER NOT NULL DEFAULT 0,
+    total_loaned_amount NUMERIC(14, 2) NOT NULL DEFAULT 0.00,
+    total_due NUMERIC(14, 2) NOT NULL DEFAULT 0.00,
+    total_paid NUMERIC(14, 2) NOT NULL DEFAULT 0.00,
+    total_commission NUMERIC(16, 4) NOT NULL DEFAULT 0.0000,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- =============================================================================
+-- FUNCIÓN PARA MANTENER EL LIBRO MAYOR DE PAGOS (loan_balances)
+-- =============================================================================
+CREATE OR REPLACE FUNCTION apply_payment_to_loan_balance()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE loan_balances SET
+            payments_made = payments_made - 1,
+            total_paid = total_paid - OLD.amount_paid,
+            last_payment_date = (SELECT MAX(payment_date) FROM payments WHERE loan_id = OLD.loan_id),
+            updated_at = NOW()
+        WHERE loan_id = OLD.loan_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO loan_balances (loan_id, payments_made, total_paid, last_payment_date)
+        VALUES (NEW.loan_id, 1, NEW.amount_paid, NEW.payment_date)
+        ON CONFLICT (loan_id) DO UPDATE SET
+            payments_made = loan_balances.payments_made + 1,
+            total_paid = loan_balances.total_paid + EXCLUDED.total_paid,
+            last_payment_date = GREATEST(loan_balances.last_payment_date, EXCLUDED.last_payment_date),
+            updated_at = NOW();
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- =============================================================================
+-- FUNCIÓN PARA INVALIDAR LA TABLA DE AMORTIZACIÓN AL CAMBIAR LOS TÉRMINOS
+-- =============================================================================
+CREATE OR REPLACE FUNCTION invalidate_loan_schedule()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM loan_schedule WHERE loan_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- =============================================================================
+-- FUNCIONES PARA MANTENER EL RESUMEN POR ASOCIADO (associate_portfolio_stats)
+-- =============================================================================
+-- Total a pagar de un préstamo: misma anualidad que el backend
+-- (`amortization.batch_payment_totals` / `LOAN_TOTAL_DUE_SQL`).
+CREATE OR REPLACE FUNCTION loan_total_due(p_amount NUMERIC, p_interest_rate NUMERIC, p_term_months NUMERIC, p_payment_frequency VARCHAR)
+RETURNS NUMERIC AS $$
+DECLARE
+    periods float8 := (CASE WHEN p_payment_frequency = 'quincenal' THEN p_term_months * 2 ELSE p_term_months END)::float8;
+    rate float8 := (p_interest_rate / 100.0 / CASE WHEN p_payment_frequency = 'quincenal' THEN 24 ELSE 12 END)::float8;
+BEGIN
+    IF p_interest_rate > 0 AND periods > 0 AND ROUND(periods) > 0 THEN
+        RETURN ROUND((p_amount * rate / (1 - POWER(1 + rate, -periods)))::numeric, 2) * ROUND(periods)::int;
+    END IF;
+    RETURN p_amount;
+END;
+$$ language 'plpgsql' IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION add_to_associate_stats(
+    p_associate_id INTEGER, p_loans INTEGER, p_active INTEGER,
+    p_amount NUMERIC, p_due NUMERIC, p_paid NUMERIC, p_commission NUMERIC
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_associate_id IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO associate_portfolio_stats (associate_id, total_loans, active_loans, total_loaned_amount, total_due, total_paid, total_commission)
+    VALUES (p_associate_id, p_loans, p_active, p_amount, p_due, p_paid, p_commission)
+    ON CONFLICT (associate_id) DO UPDATE SET
+        total_loans = associate_portfolio_stats.total_loans + EXCLUDED.total_loans,
+        active_loans = associate_portfolio_stats.active_loans + EXCLUDED.active_loans,
+        total_loaned_amount = associate_portfolio_stats.total_loaned_amount + EXCLUDED.total_loaned_amount,
+        total_due = associate_portfolio_stats.total_due + EXCLUDED.total_due,
+        total_paid = associate_portfolio_stats.total_paid + EXCLUDED.total_paid,
+        total_commission = associate_portfolio_stats.total_commission + EXCLUDED.total_commission,
+        updated_at = NOW();
+END;
+$$ language 'plpgsql';
+
+-- Resta la contribución anterior del préstamo y suma la nueva. Lo pagado sólo
+-- se mueve aquí cuando el préstamo cambia de asociado; lo demás lo aplica el
+-- trigger de `loan_balances`.
+CREATE OR REPLACE FUNCTION apply_loan_to_associate_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    moved_paid NUMERIC := 0;
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.associate_id IS DISTINCT FROM NEW.associate_id THEN
+        moved_paid := COALESCE((SELECT total_paid FROM loan_balances WHERE loan_id = NEW.id), 0);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM add_to_associate_stats(
+            OLD.associate_id, -1, -(OLD.status = 'active')::int, -OLD.amount,
+            -loan_total_due(OLD.amount, OLD.interest_rate, OLD.term_months, OLD.payment_frequency),
+            -moved_paid, -(OLD.amount * OLD.commission_rate / 100.0)
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM add_to_associate_stats(
+            NEW.associate_id, 1, (NEW.status = 'active')::int, NEW.amount,
+            loan_total_due(NEW.amount, NEW.interest_rate, NEW.term_months, NEW.payment_frequency),
+            moved_paid, NEW.amount * NEW.commission_rate / 100.0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION apply_balance_to_associate_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    paid_delta NUMERIC := COALESCE(NEW.total_paid, 0) - COALESCE(OLD.total_paid, 0);
+BEGIN
+    IF paid_delta <> 0 THEN
+        PERFORM add_to_associate_stats(
+            (SELECT associate_id FROM loans WHERE id = COALESCE(NEW.loan_id, OLD.loan_id)),
+            0, 0, 0, 0, paid_delta, 0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- =============================================================================
+-- FUNCIÓN PARA AVISAR AL BACKEND DE CAMBIOS EN LOS DATOS DE UN CLIENTE
+-- =============================================================================
+-- Publica en el canal `client_dashboard_changes` el id del usuario cuyos
+-- préstamos o pagos cambiaron; el backend invalida su dashboard en caché.
+CREATE OR REPLACE FUNCTION notify_client_dashboard_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    user_ids INTEGER[];
+BEGIN
+    IF TG_TABLE_NAME = 'loans' THEN
+        user_ids := ARRAY[NEW.user_id, OLD.user_id];
+    ELSE
+        user_ids := ARRAY(SELECT user_id FROM loans WHERE id IN (NEW.loan_id, OLD.loan_id));
+    END IF;
+    PERFORM pg_notify('client_dashboard_changes', u::text)
+    FROM (SELECT DISTINCT u FROM unnest(user_ids) AS u WHERE u IS NOT NULL) changed;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
 -- =============================================================================
 -- ASIGNACIÓN DE TRIGGERS
 -- =============================================================================
@@ -104,4 +299,12 @@ CREATE TRIGGER update_associates_updated_at BEFORE UPDATE ON associates FOR EACH
 CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
 CREATE TRIGGER update_beneficiaries_updated_at BEFORE UPDATE ON beneficiaries FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
 CREATE TRIGGER update_loans_updated_at BEFORE UPDATE ON loans FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
-CREATE TRIGGER update_payments_updated_at BEFORE UPDATE ON payments FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
\ No newline at end of file
+CREATE TRIGGER update_payments_updated_at BEFORE UPDATE ON payments FOR EACH ROW EXECUTE PROCEDURE update_updated_at_column();
+CREATE TRIGGER update_loan_balances_on_payment AFTER INSERT OR UPDATE OR DELETE ON payments FOR EACH ROW EXECUTE PROCEDURE apply_payment_to_loan_balance();
+CREATE TRIGGER update_associate_stats_on_loan_change AFTER INSERT OR DELETE OR UPDATE OF associate_id, status, amount, interest_rate, term_months, payment_frequency, commission_rate ON loans FOR EACH ROW EXECUTE PROCEDURE apply_loan_to_associate_stats();
+CREATE TRIGGER update_associate_stats_on_balance_change AFTER INSERT OR UPDATE OR DELETE ON loan_balances FOR EACH ROW EXECUTE PROCEDURE apply_balance_to_associate_stats();
+CREATE TRIGGER notify_client_dashboard_on_loan_change AFTER INSERT OR UPDATE OR DELETE ON loans FOR EACH ROW EXECUTE PROCEDURE notify_client_dashboard_change();
+CREATE TRIGGER notify_client_dashboard_on_payment_change AFTER INSERT OR UPDATE OR DELETE ON payments FOR EACH ROW EXECUTE PROCEDURE notify_client_dashboard_change();
+CREATE TRIGGER invalidate_loan_schedule_on_terms_change AFTER UPDATE OF amount, interest_rate, term_months, payment_frequency, created_at ON loans FOR EACH ROW
+    WHEN ((OLD.amount, OLD.interest_rate, OLD.term_months, OLD.payment_frequency, OLD.created_at) IS DISTINCT FROM (NEW.amount, NEW.interest_rate, NEW.term_months, NEW.payment_frequency, NEW.created_at))
+    EXECUTE PROCEDURE invalidate_loan_schedule();